@@ -24,7 +24,7 @@ from modules import (
     debug_log,
     init_log_file,
 )
-from modules.config import USE_HTTP_PROXY, HTTP_PROXY
+from modules.config import get_system_proxy
 
 
 class UILogger:
@@ -285,16 +285,18 @@ class FF14DCTGUI(tk.Tk):
             self._debug(f"当前GUI版本: v{VERSION}")
 
         # 显示系统代理信息
-        if USE_HTTP_PROXY and HTTP_PROXY:
-            self._log(f"检测到系统HTTP代理: {HTTP_PROXY}")
-            self._debug(f"代理已应用: {HTTP_PROXY}")
+        use_proxy, http_proxy = get_system_proxy()
+        if use_proxy and http_proxy:
+            self._log(f"检测到系统HTTP代理: {http_proxy}")
+            self._debug(f"代理已应用: {http_proxy}")
         else:
             self._log("未检测到系统HTTP代理")
             self._debug("代理模式: 直连")
 
         self.runtime_service.record_app_start()
 
-        version_result = self.runtime_service.check_version()
+        # 版本检查与公告读取互不依赖，并行请求
+        version_result, announcements = self.runtime_service.fetch_startup_info()
         version_info = version_result.get("version_info")
         latest_version = None
 
@@ -330,7 +332,7 @@ class FF14DCTGUI(tk.Tk):
         else:
             self._log("版本检查：当前为可用版本。")
 
-        self._refresh_announcements()
+        self._refresh_announcements(announcements)
         self._try_cached_login()
 
     def on_close(self):
@@ -499,17 +501,11 @@ class FF14DCTGUI(tk.Tk):
             return False
 
         try:
-            orders = self.return_service.fetch_active_orders()
+            return self.return_service.has_active_order(role_name)
         except Exception as e:
             self._log(f"检查待返回状态失败，按可继续处理: {e}")
             return False
 
-        for order in orders:
-            order_role = order.get("roleName") or (order.get("migrationDetailList") or [{}])[0].get("roleName", "")
-            if order_role == role_name:
-                return True
-        return False
-
     def _try_apply_last_transfer_selection(self):
         """在满足条件时自动回填上次传送选项。"""
         record = self._read_last_transfer_record()
@@ -712,7 +708,7 @@ class FF14DCTGUI(tk.Tk):
 
         self._log("获取角色列表…")
         roles = self.api.fetch_role_list(area.get("areaId"), server.get("groupId"))
-        names = [r.get("roleName", r.get("name", "")) for r in roles]
+        names = [r["_display_name"] for r in roles]
         self._log("获取角色列表完毕。")
         self._sync_combobox_default(self.role_cb, self.role_var, names)
 
@@ -893,9 +889,10 @@ class FF14DCTGUI(tk.Tk):
         """响应公告刷新请求。"""
         self._run_bg(self._refresh_announcements)
 
-    def _refresh_announcements(self):
-        """加载并显示公告文本内容。"""
-        ads = self.runtime_service.get_bottom_announcements()
+    def _refresh_announcements(self, ads=None):
+        """加载并显示公告文本内容；ads 为已获取的公告时直接显示。"""
+        if ads is None:
+            ads = self.runtime_service.get_bottom_announcements()
         if not ads:
             content = "暂无公告。"
         else:
@@ -985,7 +982,7 @@ class FF14DCTGUI(tk.Tk):
     def _check_update(self):
         """执行版本检查并按结果展示提示。"""
         self._log("正在检查更新…")
-        version_result = self.runtime_service.check_version()
+        version_result = self.runtime_service.check_version(force=True)
         version_info = version_result.get("version_info")
         self._debug(
             f"检查更新结果: can_continue={version_result.get('can_continue')}, is_latest={version_result.get('is_latest')}"
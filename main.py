@@ -14,13 +14,15 @@ FF14 跨数据中心旅行工具 (Data Center Travel)
 
 import sys
 import signal
+import threading
+from concurrent.futures import Future
 
 # 导入模块
 from modules import (
     VERSION, ConfigManager, DEBUG_MODE,
     debug_log, init_log_file, FF14APIClient,
     telemetry, version_client,
-    BrowserManager, TransferService, ReturnService,
+    TransferService, ReturnService,
     credential_manager,
     print_header, show_main_menu,
     show_version_update_notice, show_version_blocked_notice,
@@ -29,7 +31,28 @@ from modules import (
 )
 
 # 导入代理配置用于显示信息
-from modules.config import USE_HTTP_PROXY, HTTP_PROXY
+from modules.config import get_system_proxy
+from modules.api import prewarm
+from modules.backend import prewarm_backend
+
+
+def _run_in_daemon(func, name):
+    """
+    在守护线程中执行函数，返回代表其结果的Future
+    线程池的工作线程在解释器退出时会被等待，卡住的密钥环/网络调用会阻止程序退出
+    """
+    future = Future()
+    
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=runner, daemon=True, name=name).start()
+    return future
 
 
 class FF14DCTApp:
@@ -39,9 +62,14 @@ class FF14DCTApp:
         self.config = ConfigManager()
         self.browser = None
         self.api_client = None
-        self._interrupted = False
+        self._interrupt_event = threading.Event()
         self._interrupt_count = 0
         
+        # 启动阶段的后台任务（版本检查、读取缓存凭据）
+        self._background_futures = []
+        self._version_future = None
+        self._cookies_future = None
+        
         # 设置信号处理
         signal.signal(signal.SIGINT, self._signal_handler)
     
@@ -53,12 +81,39 @@ class FF14DCTApp:
             print()
             print("[中断] 检测到 Ctrl+C，正在安全退出...")
             print("[提示] 再次按 Ctrl+C 将强制退出")
-            self._interrupted = True
+            self._interrupt_event.set()
+            # 抛出中断以打断正在阻塞的调用（input/网络请求/倒计时等待），
+            # 而不是等它自然返回后再检查中断标记
+            raise KeyboardInterrupt
         else:
             print()
             print("[强制退出] 检测到第二次 Ctrl+C，立即退出")
             sys.exit(1)
     
+    def _start_background_tasks(self):
+        """
+        并行执行与用户交互无关的启动I/O任务
+        版本检查(网络)与读取缓存凭据(系统密钥环)互不依赖，提前提交以重叠等待时间
+        任务运行在守护线程中，退出时不会等待未完成的任务
+        """
+        # 用户阅读启动信息时提前建立到接口主机与后端的连接
+        self._submit_background(prewarm, "startup-prewarm")
+        self._submit_background(prewarm_backend, "startup-prewarm-backend")
+        self._version_future = self._submit_background(version_client.check_version, "startup-version")
+        self._cookies_future = self._submit_background(credential_manager.load_cookies, "startup-cookies")
+    
+    def _submit_background(self, func, name):
+        """提交一个启动后台任务并登记，便于退出时统一取消"""
+        future = _run_in_daemon(func, name)
+        self._background_futures.append(future)
+        return future
+    
+    def _shutdown_background_tasks(self):
+        """取消尚未开始的启动任务，已在运行的任务随守护线程在退出时结束"""
+        for future in self._background_futures:
+            future.cancel()
+        self._background_futures = []
+    
     def check_version(self):
         """
         检查版本更新
@@ -66,7 +121,10 @@ class FF14DCTApp:
         """
         print("[信息] 正在检查版本...")
         
-        version_info = version_client.check_version()
+        if self._version_future:
+            version_info = self._version_future.result()
+        else:
+            version_info = version_client.check_version()
         
         if version_info is None:
             # 无法检查版本，允许继续
@@ -105,7 +163,10 @@ class FF14DCTApp:
         print("\n[信息] 检查缓存的登录凭据...")
         
         # 尝试从密钥环加载Cookies
-        cached_cookies = credential_manager.load_cookies()
+        if self._cookies_future:
+            cached_cookies = self._cookies_future.result()
+        else:
+            cached_cookies = credential_manager.load_cookies()
         
         if not cached_cookies:
             print("[信息] 未找到缓存的登录凭据")
@@ -134,16 +195,18 @@ class FF14DCTApp:
         """初始化浏览器并等待用户登录"""
         print("\n[步骤1] 初始化浏览器...")
         
+        # 仅在需要浏览器登录时才加载 selenium
+        from modules import BrowserManager
         self.browser = BrowserManager(self.config)
         
-        if self._interrupted:
+        if self._interrupt_event.is_set():
             return False
         
         if not self.browser.init_browser():
             show_error_message("浏览器初始化失败")
             return False
         
-        if self._interrupted:
+        if self._interrupt_event.is_set():
             return False
         
         print("[步骤2] 打开登录页面...")
@@ -151,7 +214,7 @@ class FF14DCTApp:
             show_error_message("无法打开登录页面")
             return False
         
-        if self._interrupted:
+        if self._interrupt_event.is_set():
             return False
         
         print("[步骤3] 等待用户登录后返回...")
@@ -164,10 +227,10 @@ class FF14DCTApp:
             input()
         except (EOFError, KeyboardInterrupt):
             print("\n[中断] 用户取消操作")
-            self._interrupted = True
+            self._interrupt_event.set()
             return False
         
-        if self._interrupted:
+        if self._interrupt_event.is_set():
             return False
         
         # 获取Cookie
@@ -205,7 +268,7 @@ class FF14DCTApp:
         transfer_service = TransferService(self.api_client, self.config)
         return_service = ReturnService(self.api_client, self.config)
         
-        while not self._interrupted:
+        while not self._interrupt_event.is_set():
             # 显示主菜单
             choice = show_main_menu(self.config)
             
@@ -225,7 +288,7 @@ class FF14DCTApp:
             else:
                 print("[错误] 无效的选项，请重新输入")
             
-            if self._interrupted:
+            if self._interrupt_event.is_set():
                 break
             
             # 传送业务结束后直接退出
@@ -237,33 +300,36 @@ class FF14DCTApp:
             # 初始化日志文件（开发模式）
             init_log_file()
             
+            # 提前启动后台任务，与后续输出和遥测请求并行
+            self._start_background_tasks()
+            
             # 显示程序头部
             print_header()
             
             # 显示代理配置信息
-            if USE_HTTP_PROXY and HTTP_PROXY:
-                print(f"[信息] 检测到系统HTTP代理: {HTTP_PROXY}")
-                debug_log(f"HTTP代理已启用: {HTTP_PROXY}")
+            use_proxy, http_proxy = get_system_proxy()
+            if use_proxy and http_proxy:
+                print(f"[信息] 检测到系统HTTP代理: {http_proxy}")
+                debug_log(f"HTTP代理已启用: {http_proxy}")
             else:
                 print("[信息] 未检测到系统HTTP代理，将直接连接")
                 debug_log("未使用HTTP代理")
             
-            # 记录应用启动遥测
+            # 记录应用启动遥测（加入后台发送队列，不阻塞启动流程）
             telemetry.record_app_start()
-            debug_log("已记录应用启动统计")
             
             # 检查版本
             if not self.check_version():
                 wait_for_enter("按回车键退出...")
                 return
             
-            if self._interrupted:
+            if self._interrupt_event.is_set():
                 return
             
             # 尝试使用缓存的Cookies登录
             cached_login_success = self.try_cached_login()
             
-            if self._interrupted:
+            if self._interrupt_event.is_set():
                 return
             
             if not cached_login_success:
@@ -272,7 +338,7 @@ class FF14DCTApp:
                     wait_for_enter("按回车键退出...")
                     return
                 
-                if self._interrupted:
+                if self._interrupt_event.is_set():
                     return
                 
                 # 获取游戏数据（浏览器登录后需要获取）
@@ -282,7 +348,7 @@ class FF14DCTApp:
             
             # 注意：缓存登录成功时，fetch_area_list已在try_cached_login中调用成功
             
-            if self._interrupted:
+            if self._interrupt_event.is_set():
                 return
             
             # 运行主循环
@@ -302,6 +368,8 @@ class FF14DCTApp:
         """清理资源"""
         print("\n[清理] 正在关闭资源...")
         
+        self._shutdown_background_tasks()
+        
         if close_browser and self.browser:
             self.browser.close()
         
@@ -4,29 +4,55 @@
 FF14DCT 模块包
 """
 
+import importlib
+
 from .config import (
     VERSION, ConfigManager, DEBUG_MODE,
     BASE_DIR, CONFIG_FILE, LOG_DIR
 )
 from .logger import debug_log, log_transfer_history, init_log_file
-from .api import FF14APIClient
-from .backend import telemetry, version_client, ads_client
-from .browser import BrowserManager
-from .transfer import TransferService
-from .return_home import ReturnService
-from .services import (
-    LoginService,
-    RuntimeService,
-    TransferOrchestrator,
-    ReturnOrchestrator,
-)
-from .credential import credential_manager
-from .ui import (
-    print_header, print_after_action_ads,
-    show_main_menu, show_version_update_notice, show_version_blocked_notice,
-    show_success_message, show_error_message, show_info_message,
-    wait_for_enter
-)
+
+# 以下对象在首次访问时才导入（PEP 562），
+# 避免启动阶段就加载 requests / selenium / keyring 等重型依赖
+_LAZY_ATTRS = {
+    'FF14APIClient': '.api',
+    'telemetry': '.backend',
+    'version_client': '.backend',
+    'ads_client': '.backend',
+    'BrowserManager': '.browser',
+    'TransferService': '.transfer',
+    'ReturnService': '.return_home',
+    'LoginService': '.services',
+    'RuntimeService': '.services',
+    'TransferOrchestrator': '.services',
+    'ReturnOrchestrator': '.services',
+    'credential_manager': '.credential',
+    'print_header': '.ui',
+    'print_after_action_ads': '.ui',
+    'show_main_menu': '.ui',
+    'show_version_update_notice': '.ui',
+    'show_version_blocked_notice': '.ui',
+    'show_success_message': '.ui',
+    'show_error_message': '.ui',
+    'show_info_message': '.ui',
+    'wait_for_enter': '.ui',
+}
+
+
+def __getattr__(name):
+    """按需导入延迟加载的对象，并缓存到模块全局变量"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """列出模块属性（包含延迟加载的对象）"""
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
 __all__ = [
     'VERSION',
@@ -5,69 +5,245 @@ FF14DCT 网络接口模块
 负责所有HTTP请求的封装
 """
 
+import os
 import json
-import urllib.parse
+import time
+import atexit
+from types import MappingProxyType
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .config import (
-    DEBUG_MODE, USER_AGENT, USE_HTTP_PROXY, HTTP_PROXY,
+    DEBUG_MODE, USER_AGENT, get_system_proxy,
     FF14_APP_ID, FF14_API_PAGE_INIT, FF14_API_GROUP_LIST,
     FF14_API_ROLE_LIST, FF14_API_TRAVEL_ORDER, FF14_API_ORDER_STATUS,
-    FF14_API_GROUP_LIST_CROSS_SOURCE, FF14_API_TRAVEL_BACK, FF14_API_MIGRATION_ORDERS
+    FF14_API_GROUP_LIST_CROSS_SOURCE, FF14_API_TRAVEL_BACK, FF14_API_MIGRATION_ORDERS,
+    CACHE_DISABLED, AREA_CACHE_FILE, RETURN_AREA_CACHE_FILE, AREA_LIST_TTL
 )
 from .logger import debug_log, log_request
+from .json_codec import json_loads
+
+
+# 固定不变的请求地址与请求头，在模块导入时生成一次
+_URL_GROUP_LIST = f"{FF14_API_GROUP_LIST}?appId={FF14_APP_ID}"
+_URL_GROUP_LIST_CROSS = f"{FF14_API_GROUP_LIST_CROSS_SOURCE}?appId={FF14_APP_ID}"
+_BASE_HEADERS = MappingProxyType({
+    'User-Agent': USER_AGENT,
+    'Accept': 'application/json',
+    'Accept-Language': 'zh-CN,zh;q=0.9',
+    'Connection': 'keep-alive',
+})
+
+def _create_http_adapter(retry=True):
+    """
+    创建带连接池的HTTP适配器
+    查询类接口在网关错误时自动重试；提交类接口不重试，避免重复下单
+    """
+    max_retries = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503, 504],
+        allowed_methods={"GET"},
+    ) if retry else 0
+    return HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=max_retries)
+
+
+# 进程内共享的连接池：所有会话挂载同一组适配器，同一主机的连接只需握手一次
+_HTTP_ADAPTER = _create_http_adapter()
+_NO_RETRY_ADAPTER = _create_http_adapter(retry=False)
+
+
+def _close_adapters():
+    """退出时关闭共享连接池中的连接"""
+    for adapter in (_HTTP_ADAPTER, _NO_RETRY_ADAPTER):
+        try:
+            adapter.close()
+        except Exception:
+            pass
+
+
+atexit.register(_close_adapters)
+
+
+def create_session(headers=None):
+    """
+    创建挂载共享连接池的会话
+    每个会话有独立的Cookie，连接池在进程内复用
+    """
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    session.mount("https://", _HTTP_ADAPTER)
+    session.mount("http://", _HTTP_ADAPTER)
+    for submit_url in (FF14_API_TRAVEL_ORDER, FF14_API_TRAVEL_BACK):
+        session.mount(submit_url, _NO_RETRY_ADAPTER)
+    
+    # 设置HTTP代理
+    use_proxy, http_proxy = get_system_proxy()
+    if use_proxy and http_proxy:
+        session.proxies = {
+            'http': http_proxy,
+            'https': http_proxy
+        }
+    return session
+
+
+def prewarm(url=FF14_API_GROUP_LIST):
+    """
+    预热到接口主机的连接（DNS解析 + TCP/TLS握手）
+    通过共享连接池发送一次HEAD请求，建立的连接留在池中供首个正式请求复用；
+    失败时静默忽略，不影响后续流程
+    """
+    parts = urlsplit(url)
+    try:
+        create_session(_BASE_HEADERS).head(
+            f"{parts.scheme}://{parts.netloc}/", timeout=3, allow_redirects=False
+        )
+        debug_log(f"连接预热完成: {parts.netloc}")
+    except Exception as e:
+        debug_log(f"连接预热失败: {e}")
+
+
+def _json(response):
+    """
+    解析接口返回的JSON
+    SDO接口固定返回UTF-8，直接解码原始字节，省去 response.json() 的编码探测；
+    开发模式下 log_request 已解析过的响应直接复用结果
+    """
+    cached = getattr(response, '_cached_json', None)
+    if cached is not None:
+        return cached
+    return json_loads(response.content)
+
+
+def _load_list_cache(cache_path):
+    """
+    读取条件请求缓存
+    返回: {'etag': str, 'last_modified': str, 'items': list} 或 None
+    """
+    if CACHE_DISABLED or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('items') and (cache.get('etag') or cache.get('last_modified')):
+            return cache
+    except Exception as e:
+        debug_log(f"读取缓存失败 ({cache_path}): {e}")
+    return None
+
+
+def _conditional_headers(cache):
+    """根据缓存生成 If-None-Match / If-Modified-Since 请求头"""
+    headers = {}
+    if cache:
+        if cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        if cache.get('last_modified'):
+            headers['If-Modified-Since'] = cache['last_modified']
+    return headers
+
+
+def _save_list_cache(cache_path, response, items):
+    """服务器返回了缓存校验头时，原子写入缓存"""
+    if CACHE_DISABLED:
+        return
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if not etag and not last_modified:
+        return
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'etag': etag,
+                'last_modified': last_modified,
+                'items': items
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        debug_log(f"写入缓存失败 ({cache_path}): {e}")
 
 
 class FF14APIClient:
     """FF14 API客户端"""
     
+    # 角色列表请求超时（秒），后台预取的等待时间也以此为上限
+    ROLE_LIST_TIMEOUT = 10
+    
     def __init__(self):
-        self.session = requests.Session()
+        # 每个客户端单独持有登录Cookie，避免重新登录后残留旧Cookie
+        self.session = create_session(_BASE_HEADERS)
         self.cookies = {}
         self.area_list = []
         
-        # 设置请求头
-        self.session.headers.update({
-            'User-Agent': USER_AGENT,
-            'Accept': 'application/json',
-            'Accept-Language': 'zh-CN,zh;q=0.9',
-        })
+        # 区服列表的只读视图与索引（在 fetch_area_list 成功后构建）
+        self._areas_view = ()
+        self._area_by_name = {}
+        self._target_areas = {}
         
-        # 设置HTTP代理
-        if USE_HTTP_PROXY and HTTP_PROXY:
-            self.session.proxies = {
-                'http': HTTP_PROXY,
-                'https': HTTP_PROXY
-            }
+        # 区服列表在 AREA_LIST_TTL 秒内重复获取时直接使用内存中的结果
+        self._area_list_expires = 0.0
+        self._return_area_list = None
+        self._return_area_list_expires = 0.0
     
     def set_cookies(self, cookies_dict):
         """设置Cookies"""
         self.cookies = cookies_dict
+        # 更换登录凭据后，之前账号的区服数据不再可信
+        self.area_list = []
+        self._reset_area_index()
+        self._area_list_expires = 0.0
+        self._return_area_list = None
+        self._return_area_list_expires = 0.0
         for name, value in cookies_dict.items():
             self.session.cookies.set(name, value, domain='.sdo.com')
     
-    def fetch_area_list(self):
-        """获取区服列表"""
+    def fetch_area_list(self, force=False):
+        """
+        获取区服列表
+        成功结果在内存中保留 AREA_LIST_TTL 秒，期间重复调用不再请求；force=True 时跳过
+        """
+        if not force and self.area_list and time.monotonic() < self._area_list_expires:
+            debug_log("区服列表未过期，使用内存中的结果")
+            return True
+        
         try:
-            url = f"{FF14_API_GROUP_LIST}?appId={FF14_APP_ID}"
+            url = _URL_GROUP_LIST
             
-            debug_log(f"请求区服列表: {url}")
-            response = self.session.get(url, timeout=10)
-            log_request("GET", url, dict(self.session.cookies), response)
+            # 区服拓扑很少变化，带上缓存校验头，未变化时服务器返回304
+            cache = _load_list_cache(AREA_CACHE_FILE)
             
-            data = response.json()
-            
-            if data.get('return_code') != 0:
-                print(f"[错误] 获取区服列表失败: {data.get('return_message', '未知错误')}")
-                return False
+            debug_log(f"请求区服列表: {url}")
+            response = self.session.get(url, headers=_conditional_headers(cache), timeout=10)
+            if DEBUG_MODE:
+                log_request("GET", url, self.session.cookies, response)
             
-            # 解析区服列表
-            group_list_str = data.get('data', {}).get('groupList', '[]')
-            self.area_list = json.loads(group_list_str)
+            if response.status_code == 304 and cache:
+                debug_log("区服列表未变化，使用本地缓存")
+                self.area_list = cache['items']
+            else:
+                data = _json(response)
+                
+                if data.get('return_code') != 0:
+                    print(f"[错误] 获取区服列表失败: {data.get('return_message', '未知错误')}")
+                    return False
+                
+                # 解析区服列表
+                group_list_str = data.get('data', {}).get('groupList', '[]')
+                self.area_list = json_loads(group_list_str)
+                if self.area_list:
+                    _save_list_cache(AREA_CACHE_FILE, response, self.area_list)
             
             if not self.area_list:
                 print("[错误] 区服列表为空")
                 return False
             
+            self._build_area_index()
+            if not CACHE_DISABLED:
+                self._area_list_expires = time.monotonic() + AREA_LIST_TTL
+            
             print(f"[成功] 已获取 {len(self.area_list)} 个大区信息")
             return True
             
@@ -88,9 +264,10 @@ class FF14APIClient:
             
             debug_log(f"页面初始化请求: {url}")
             response = self.session.get(url, timeout=10)
-            log_request("GET", url, dict(self.session.cookies), response)
+            if DEBUG_MODE:
+                log_request("GET", url, self.session.cookies, response)
             
-            data = response.json()
+            data = _json(response)
             
             if data.get('return_code') == 0:
                 print("[信息] 页面初始化成功")
@@ -106,34 +283,52 @@ class FF14APIClient:
     def fetch_role_list(self, area_id, group_id):
         """获取角色列表"""
         try:
-            url = f"{FF14_API_ROLE_LIST}?appId={FF14_APP_ID}&areaId={area_id}&groupId={group_id}"
-            
-            debug_log(f"获取角色列表: {url}")
-            response = self.session.get(url, timeout=10)
-            log_request("GET", url, dict(self.session.cookies), response)
-            
-            data = response.json()
-            
-            if data.get('return_code') != 0:
-                print(f"[错误] 获取角色列表失败: {data.get('return_message', '未知错误')}")
-                return []
-            
-            # 解析角色列表
-            role_list = data.get('data', {}).get('roleList', [])
-            
-            # 如果roleList是字符串，尝试解析
-            if isinstance(role_list, str):
-                try:
-                    role_list = json.loads(role_list)
-                except:
-                    role_list = []
-            
-            return role_list
-            
+            return self._request_role_list(area_id, group_id, verbose=True)
         except Exception as e:
             print(f"[错误] 获取角色列表失败: {e}")
             return []
     
+    def prefetch_role_list(self, area_id, group_id):
+        """
+        后台预取角色列表（静默版本）
+        不输出任何内容，失败时抛出异常，由调用方在前台线程中处理和提示
+        """
+        return self._request_role_list(area_id, group_id, verbose=False)
+    
+    def _request_role_list(self, area_id, group_id, verbose):
+        """
+        请求并解析角色列表，失败时抛出异常
+        verbose=False 时不输出调试日志和请求日志（后台线程使用）
+        """
+        url = f"{FF14_API_ROLE_LIST}?appId={FF14_APP_ID}&areaId={area_id}&groupId={group_id}"
+        
+        if verbose:
+            debug_log(f"获取角色列表: {url}")
+        response = self.session.get(url, timeout=self.ROLE_LIST_TIMEOUT)
+        if verbose and DEBUG_MODE:
+            log_request("GET", url, self.session.cookies, response)
+        
+        data = _json(response)
+        
+        if data.get('return_code') != 0:
+            raise RuntimeError(data.get('return_message', '未知错误'))
+        
+        # 解析角色列表
+        role_list = data.get('data', {}).get('roleList', [])
+        
+        # 如果roleList是字符串，尝试解析
+        if isinstance(role_list, str):
+            try:
+                role_list = json_loads(role_list)
+            except:
+                role_list = []
+        
+        # 统一角色显示名称，调用方直接读取 _display_name
+        for role in role_list:
+            role['_display_name'] = role.get('roleName') or role.get('name') or '未知'
+        
+        return role_list
+    
     def submit_transfer(self, source_area, source_server, target_area, target_server, role):
         """提交跨区传送请求"""
         try:
@@ -151,33 +346,32 @@ class FF14APIClient:
             }]
             role_list_json = json.dumps(role_list, ensure_ascii=False)
             
-            # 构建请求URL
-            params = [
-                f"appId={FF14_APP_ID}",
-                f"areaId={source_area['areaId']}",
-                f"areaName={urllib.parse.quote(str(source_area['areaName']))}",
-                f"groupId={source_server['groupId']}",
-                f"groupCode={source_server['groupCode']}",
-                f"groupName={urllib.parse.quote(str(source_server['groupName']))}",
-                f"productId=1",
-                f"productNum=1",
-                f"migrationType=4",
-                f"targetArea={target_area['areaId']}",
-                f"targetAreaName={urllib.parse.quote(str(target_area['areaName']))}",
-                f"targetGroupId={target_server['groupId']}",
-                f"targetGroupCode={target_server['groupCode']}",
-                f"targetGroupName={urllib.parse.quote(str(target_server['groupName']))}",
-                f"roleList={urllib.parse.quote(role_list_json)}",
-                f"isMigrationTimes=0"
-            ]
-            
-            url = f"{FF14_API_TRAVEL_ORDER}?{'&'.join(params)}"
-            
-            debug_log(f"提交跨区传送请求URL: {url}")
-            response = self.session.get(url, timeout=15)
-            log_request("GET", url, dict(self.session.cookies), response)
-            
-            data = response.json()
+            # 构建请求参数（由requests统一编码）
+            params = {
+                'appId': FF14_APP_ID,
+                'areaId': source_area['areaId'],
+                'areaName': source_area['areaName'],
+                'groupId': source_server['groupId'],
+                'groupCode': source_server['groupCode'],
+                'groupName': source_server['groupName'],
+                'productId': 1,
+                'productNum': 1,
+                'migrationType': 4,
+                'targetArea': target_area['areaId'],
+                'targetAreaName': target_area['areaName'],
+                'targetGroupId': target_server['groupId'],
+                'targetGroupCode': target_server['groupCode'],
+                'targetGroupName': target_server['groupName'],
+                'roleList': role_list_json,
+                'isMigrationTimes': 0
+            }
+            
+            response = self.session.get(FF14_API_TRAVEL_ORDER, params=params, timeout=15)
+            debug_log(f"提交跨区传送请求URL: {response.url}")
+            if DEBUG_MODE:
+                log_request("GET", response.url, self.session.cookies, response)
+            
+            data = _json(response)
             
             if data.get('return_code') == 0:
                 result_data = data.get('data', {})
@@ -199,16 +393,17 @@ class FF14APIClient:
             print(f"[错误] 提交跨区传送请求失败: {e}")
             return None
     
-    def check_order_status(self, order_id):
+    def check_order_status(self, order_id, timeout=10):
         """查询订单状态"""
         try:
             url = f"{FF14_API_ORDER_STATUS}?orderId={order_id}"
             
             debug_log(f"查询订单状态: {url}")
-            response = self.session.get(url, timeout=10)
-            log_request("GET", url, dict(self.session.cookies), response)
+            response = self.session.get(url, timeout=timeout)
+            if DEBUG_MODE:
+                log_request("GET", url, self.session.cookies, response)
             
-            data = response.json()
+            data = _json(response)
             
             if data.get('return_code') == 0:
                 result_data = data.get('data', {})
@@ -237,43 +432,122 @@ class FF14APIClient:
             print(f"[错误] 查询订单状态失败: {e}")
             return -1
     
+    def poll_order_status(self, order_id, max_wait=120, sleep_cb=time.sleep, status_cb=None):
+        """
+        轮询订单状态，直到传送成功、预检失败或等待超时
+        查询间隔从0.5秒开始按1.7倍递增（最长8秒），状态快速变化时能更早发现，
+        长时间处理中时减少请求次数
+        max_wait 按实际经过时间计算（包含请求耗时），单次请求的超时不超过剩余时间
+        
+        :param order_id: 订单号
+        :param max_wait: 最长等待秒数
+        :param sleep_cb: 等待函数，默认 time.sleep
+        :param status_cb: 每次查询后的回调 status_cb(status)
+        :return: 5=传送成功, -1=预检失败, -2=等待超时
+        """
+        deadline = time.monotonic() + max_wait
+        delay = 0.5
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return -2
+            status = self.check_order_status(order_id, timeout=min(10, max(1.0, remaining)))
+            if status_cb:
+                status_cb(status)
+            if status in (5, -1):
+                return status
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return -2
+            sleep_cb(min(delay, remaining))
+            delay = min(delay * 1.7, 8.0)
+    
+    def _build_area_index(self):
+        """根据区服列表构建大区视图、大区名称索引及各源大区的目标大区列表"""
+        self._areas_view = tuple(
+            {'areaId': a['areaId'], 'areaName': a['areaName'], 'groups': a['groups']}
+            for a in self.area_list
+        )
+        self._area_by_name = {a['areaName']: a for a in self._areas_view}
+        # 各源大区对应的目标大区列表（排除源大区本身），大区数量很少，一次性生成
+        self._target_areas = {
+            source['areaId']: tuple(a for a in self._areas_view if a['areaId'] != source['areaId'])
+            for source in self._areas_view
+        }
+    
+    def _reset_area_index(self):
+        """清空区服索引"""
+        self._areas_view = ()
+        self._area_by_name = {}
+        self._target_areas = {}
+    
     def get_areas(self):
-        """获取大区列表"""
-        return [{'areaId': a['areaId'], 'areaName': a['areaName'], 'groups': a['groups']} 
-                for a in self.area_list]
+        """获取大区列表（只读元组，多次调用返回同一对象）"""
+        return self._areas_view
     
     def get_servers(self, area):
         """获取服务器列表"""
         return area.get('groups', [])
     
+    def get_target_areas(self, source_area):
+        """获取可作为传送目标的大区列表（排除源大区，只读元组）"""
+        area_id = source_area.get('areaId')
+        targets = self._target_areas.get(area_id)
+        if targets is None:
+            targets = tuple(a for a in self._areas_view if a['areaId'] != area_id)
+        return targets
+    
+    def find_area_by_name(self, area_name):
+        """按大区名称查找大区，不存在返回None"""
+        return self._area_by_name.get(area_name)
+    
     # ==================== 超域返回相关API ====================
     
-    def fetch_return_area_list(self):
+    def fetch_return_area_list(self, force=False):
         """
         获取超域返回可用的区服列表
         使用 queryGroupListCrossSource 接口
+        与 fetch_area_list 相同，成功结果在内存中保留 AREA_LIST_TTL 秒；force=True 时跳过
         """
+        if not force and self._return_area_list and time.monotonic() < self._return_area_list_expires:
+            debug_log("超域返回区服列表未过期，使用内存中的结果")
+            return self._return_area_list
+        
         try:
-            url = f"{FF14_API_GROUP_LIST_CROSS_SOURCE}?appId={FF14_APP_ID}"
-            
-            debug_log(f"请求超域返回区服列表: {url}")
-            response = self.session.get(url, timeout=10)
-            log_request("GET", url, dict(self.session.cookies), response)
+            url = _URL_GROUP_LIST_CROSS
             
-            data = response.json()
+            # 与 fetch_area_list 相同，带上缓存校验头，未变化时服务器返回304
+            cache = _load_list_cache(RETURN_AREA_CACHE_FILE)
             
-            if data.get('return_code') != 0:
-                print(f"[错误] 获取超域返回区服列表失败: {data.get('return_message', '未知错误')}")
-                return None
+            debug_log(f"请求超域返回区服列表: {url}")
+            response = self.session.get(url, headers=_conditional_headers(cache), timeout=10)
+            if DEBUG_MODE:
+                log_request("GET", url, self.session.cookies, response)
             
-            # 解析区服列表
-            group_list_str = data.get('data', {}).get('groupList', '[]')
-            area_list = json.loads(group_list_str)
+            if response.status_code == 304 and cache:
+                debug_log("超域返回区服列表未变化，使用本地缓存")
+                area_list = cache['items']
+            else:
+                data = _json(response)
+                
+                if data.get('return_code') != 0:
+                    print(f"[错误] 获取超域返回区服列表失败: {data.get('return_message', '未知错误')}")
+                    return None
+                
+                # 解析区服列表
+                group_list_str = data.get('data', {}).get('groupList', '[]')
+                area_list = json_loads(group_list_str)
+                if area_list:
+                    _save_list_cache(RETURN_AREA_CACHE_FILE, response, area_list)
             
             if not area_list:
                 print("[错误] 超域返回区服列表为空")
                 return None
             
+            if not CACHE_DISABLED:
+                self._return_area_list = area_list
+                self._return_area_list_expires = time.monotonic() + AREA_LIST_TTL
+            
             print(f"[成功] 已获取 {len(area_list)} 个可返回的大区信息")
             return area_list
             
@@ -297,9 +571,10 @@ class FF14APIClient:
             
             debug_log(f"请求迁移订单列表: {url}")
             response = self.session.get(url, timeout=10)
-            log_request("GET", url, dict(self.session.cookies), response)
+            if DEBUG_MODE:
+                log_request("GET", url, self.session.cookies, response)
             
-            data = response.json()
+            data = _json(response)
             
             if data.get('return_code') != 0:
                 print(f"[错误] 获取订单列表失败: {data.get('return_message', '未知错误')}")
@@ -311,7 +586,7 @@ class FF14APIClient:
             orderlist_str = result_data.get('orderlist', '[]')
             if isinstance(orderlist_str, str):
                 try:
-                    order_list = json.loads(orderlist_str)
+                    order_list = json_loads(orderlist_str)
                     debug_log(f"解析到 {len(order_list)} 个订单")
                 except json.JSONDecodeError as e:
                     debug_log(f"解析orderlist失败: {e}")
@@ -341,16 +616,19 @@ class FF14APIClient:
         :return: 返回结果字典或None
         """
         try:
-            # URL编码服务器名称
-            encoded_group_name = urllib.parse.quote(str(group_name))
-            
-            url = f"{FF14_API_TRAVEL_BACK}?travelOrderId={travel_order_id}&groupId={group_id}&groupCode={group_code}&groupName={encoded_group_name}"
+            params = {
+                'travelOrderId': travel_order_id,
+                'groupId': group_id,
+                'groupCode': group_code,
+                'groupName': group_name
+            }
             
-            debug_log(f"提交超域返回请求: {url}")
-            response = self.session.get(url, timeout=15)
-            log_request("GET", url, dict(self.session.cookies), response)
+            response = self.session.get(FF14_API_TRAVEL_BACK, params=params, timeout=15)
+            debug_log(f"提交超域返回请求: {response.url}")
+            if DEBUG_MODE:
+                log_request("GET", response.url, self.session.cookies, response)
             
-            data = response.json()
+            data = _json(response)
             debug_log(f"超域返回响应: {data}")
             
             if data.get('return_code') == 0:
@@ -5,33 +5,137 @@ FF14DCT 后端API模块
 负责与后端服务器通信（遥测统计、版本检查、赞助信息获取）
 """
 
+import os
+import json
+import time
+import queue
+import atexit
+import hashlib
+import threading
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .config import (
-    BACKEND_BASE_URL, VERSION, DEBUG_MODE,
-    USE_HTTP_PROXY, HTTP_PROXY
+    BACKEND_BASE_URL, VERSION,
+    CACHE_DISABLED, VERSION_CACHE_FILE, VERSION_CACHE_TTL,
+    ADS_CACHE_DIR, ADS_CACHE_TTL, ADS_CACHE_MAX_AGE
 )
 from .logger import debug_log
+from .json_codec import json_loads
+from .api import create_session
+
+
+# 统计请求的超时（连接, 读取），统计数据尽力而为，网络不佳时尽快放弃
+TELEMETRY_TIMEOUT = (1, 2)
+# 积压超过该时长（秒）仍未发送的统计直接丢弃，避免队列长期占用内存
+TELEMETRY_MAX_AGE = 30
+
+# 后端接口地址（模块导入时拼接一次）
+_URL_STATS_PREFIX = f"{BACKEND_BASE_URL}/api/stats/"
+_URL_STATS_RECORD = f"{_URL_STATS_PREFIX}record"
+_URL_VERSION_LATEST = f"{BACKEND_BASE_URL}/api/version/latest"
+_URL_ADS = f"{BACKEND_BASE_URL}/api/ads"
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_version(v):
+    """解析版本号为整数元组（只取主要版本号），结果按字符串缓存"""
+    parts = v.replace('v', '').split('.')
+    return tuple(int(p) for p in parts[:3])
+
+
+def _backend_retry(total):
+    """
+    后端GET请求的重试策略：网关错误时指数退避重试，并遵循服务端的 Retry-After
+    """
+    options = dict(
+        total=total,
+        backoff_factor=0.3,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods={"GET"},
+        respect_retry_after_header=True,
+    )
+    try:
+        # 随机抖动避免多次重试同时打到后端（urllib3 2.0+ 支持）
+        return Retry(backoff_jitter=0.2, **options)
+    except TypeError:
+        return Retry(**options)
+
+
+class _BackendAdapter(HTTPAdapter):
+    """
+    后端请求适配器：所有后端请求共用一个连接池（含代理连接池）
+    统计接口的请求在 send() 中改用较少的重试次数；按线程记录，多线程并发发送时互不影响
+    """
+    
+    def __init__(self, stats_retries, **kwargs):
+        self._local = threading.local()
+        self._stats_retries = stats_retries
+        super().__init__(**kwargs)
+    
+    @property
+    def max_retries(self):
+        retries = getattr(self._local, 'retries', None)
+        return retries if retries is not None else self._default_retries
+    
+    @max_retries.setter
+    def max_retries(self, value):
+        self._default_retries = value
+    
+    def send(self, request, **kwargs):
+        if request.url.startswith(_URL_STATS_PREFIX):
+            self._local.retries = self._stats_retries
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            self._local.retries = None
+
+
+def _create_backend_session():
+    """
+    创建访问后端的会话
+    后端请求量小，使用单独的小连接池；
+    统计数据尽力而为只重试一次，版本检查与赞助信息重试三次
+    """
+    session = create_session({'Accept': 'application/json'})
+    session.mount(BACKEND_BASE_URL, _BackendAdapter(
+        stats_retries=_backend_retry(1),
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=_backend_retry(3),
+    ))
+    return session
+
+
+# 遥测、版本检查、赞助信息访问同一后端，共用一个会话以复用连接
+_shared_session = _create_backend_session()
+# 在遥测客户端之前注册，按 atexit 后进先出的顺序，会话在遥测数据写出后才关闭
+atexit.register(_shared_session.close)
+
+
+def prewarm_backend():
+    """
+    预先建立到后端的TLS连接，留在连接池中供首个正式请求复用
+    由启动流程显式调用；失败时静默忽略，不影响后续流程
+    """
+    try:
+        _shared_session.head(BACKEND_BASE_URL, timeout=3, allow_redirects=False)
+        debug_log("后端连接预热完成")
+    except Exception as e:
+        debug_log(f"后端连接预热失败: {e}")
 
 
 class BackendClient:
     """后端API客户端"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Accept': 'application/json'
-        })
-        
-        # 设置HTTP代理
-        if USE_HTTP_PROXY and HTTP_PROXY:
-            self.session.proxies = {
-                'http': HTTP_PROXY,
-                'https': HTTP_PROXY
-            }
-    
-    def _make_request(self, method, endpoint, params=None, timeout=10):
-        """发送请求到后端"""
-        url = f"{BACKEND_BASE_URL}{endpoint}"
+        self.session = _shared_session
+    
+    def _make_request(self, method, url, params=None, timeout=10):
+        """发送请求到后端，url 为完整的接口地址"""
         try:
             if method == 'GET':
                 response = self.session.get(url, params=params, timeout=timeout)
@@ -40,13 +144,17 @@ class BackendClient:
             
             debug_log(f"Backend API: {method} {url}")
             debug_log(f"Backend Response: {response.status_code}")
-            
-            return response.json()
         except requests.exceptions.RequestException as e:
             debug_log(f"Backend API Error: {e}")
             return None
-        except Exception as e:
-            debug_log(f"Backend API Exception: {e}")
+        
+        # 非2xx响应通常是网关/错误页，不尝试按JSON解析
+        if not response.ok:
+            return None
+        try:
+            return json_loads(response.content)
+        except ValueError as e:
+            debug_log(f"Backend API 返回内容不是JSON: {e}")
             return None
 
 
@@ -57,12 +165,72 @@ class TelemetryClient(BackendClient):
     STAT_TYPE_TRANSFER = 'cross_dc_transfer'
     STAT_TYPE_RETURN = 'cross_dc_return'
     
+    DRAIN_MAX_SIZE = 50  # 后台线程单次从队列中取出的最大条数
+    
+    def __init__(self):
+        super().__init__()
+        # 统计事件先放入队列，由后台线程发送，调用方无需等待网络往返
+        self._queue = queue.Queue(maxsize=256)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        atexit.register(self.flush)
+    
     def record_stat(self, stat_type):
-        """记录统计数据"""
+        """
+        记录统计数据（异步）
+        返回: True=已加入发送队列, False=队列已满被丢弃
+        """
+        self._ensure_worker()
         try:
-            result = self._make_request('GET', '/api/stats/record', {
+            self._queue.put_nowait((stat_type, time.time()))
+            return True
+        except queue.Full:
+            debug_log(f"统计队列已满，丢弃: {stat_type}")
+            return False
+    
+    def flush(self, timeout=1.0):
+        """等待队列中的统计发送完毕，最多等待 timeout 秒"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+    
+    def _ensure_worker(self):
+        """首次记录统计时启动后台发送线程"""
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._worker_loop, daemon=True, name="telemetry"
+                )
+                self._worker.start()
+    
+    def _worker_loop(self):
+        """后台线程：取出队列中已积压的统计，丢弃过期的后逐条发送"""
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.DRAIN_MAX_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                cutoff = time.time() - TELEMETRY_MAX_AGE
+                batch = [item for item in items if item[1] >= cutoff]
+                if len(batch) < len(items):
+                    debug_log(f"丢弃 {len(items) - len(batch)} 条积压过久的统计")
+                
+                for stat_type, _ in batch:
+                    self._send_stat(stat_type)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+    
+    def _send_stat(self, stat_type):
+        """发送单条统计数据"""
+        try:
+            result = self._make_request('GET', _URL_STATS_RECORD, {
                 'type': stat_type
-            })
+            }, timeout=TELEMETRY_TIMEOUT)
             
             if result and result.get('success'):
                 debug_log(f"统计已记录: {stat_type}")
@@ -90,7 +258,7 @@ class TelemetryClient(BackendClient):
 class VersionClient(BackendClient):
     """版本检查客户端"""
     
-    def check_version(self):
+    def check_version(self, force=False):
         """
         检查版本更新
         返回: {
@@ -102,55 +270,115 @@ class VersionClient(BackendClient):
             'update_url': str,           # 更新地址
             'changelog': str             # 更新日志
         }
+        
+        服务端返回的版本数据会缓存到本地文件，在有效期内直接使用缓存，避免每次启动都请求网络
+        force=True 时跳过缓存（用于用户手动检查更新）
         """
+        debug_log(f"开始版本检查，当前版本: {VERSION}")
+        
+        data = None if force else self._read_cached_version()
+        if data is None:
+            data = self._fetch_version()
+            if data is None:
+                return None
+            if not CACHE_DISABLED:
+                # 写缓存放到后台线程，不阻塞启动流程
+                threading.Thread(
+                    target=self._write_cached_version,
+                    args=(data,),
+                    daemon=True
+                ).start()
+        
+        try:
+            return self._build_version_info(data)
+        except Exception as e:
+            debug_log(f"版本检查异常: {e}")
+            return None
+    
+    def _fetch_version(self):
+        """请求后端获取最新版本数据（服务端返回的 data 字段）"""
         try:
-            debug_log(f"开始版本检查，当前版本: {VERSION}")
-            result = self._make_request('GET', '/api/version/latest')
+            result = self._make_request('GET', _URL_VERSION_LATEST)
             
             if not result or not result.get('success'):
                 debug_log(f"版本检查API返回失败: {result}")
                 return None
             
-            data = result.get('data', {})
-            latest_version = data.get('version', VERSION)
-            is_force_update = bool(data.get('is_force_update', 0))
-            download_url = data.get('download_url', '')
-            
-            debug_log(f"服务端最新版本: {latest_version}, 强制更新: {is_force_update}")
-            debug_log(f"下载地址: {download_url if download_url else '(未设置)'}")
-            
-            is_latest = self._compare_version(VERSION, latest_version) >= 0
-            # 如果不是最新版本且需要强制更新，则不受支持
-            is_supported = is_latest or not is_force_update
+            return result.get('data', {})
+        except Exception as e:
+            debug_log(f"版本检查异常: {e}")
+            return None
+    
+    def _build_version_info(self, data):
+        """根据服务端版本数据与当前版本计算检查结果"""
+        latest_version = data.get('version', VERSION)
+        is_force_update = bool(data.get('is_force_update', 0))
+        download_url = data.get('download_url', '')
+        
+        debug_log(f"服务端最新版本: {latest_version}, 强制更新: {is_force_update}")
+        debug_log(f"下载地址: {download_url if download_url else '(未设置)'}")
+        
+        is_latest = self._compare_version(VERSION, latest_version) >= 0
+        # 如果不是最新版本且需要强制更新，则不受支持
+        is_supported = is_latest or not is_force_update
+        
+        debug_log(f"版本比较结果: is_latest={is_latest}, is_supported={is_supported}")
+        
+        return {
+            'is_latest': is_latest,
+            'current_version': VERSION,
+            'latest_version': latest_version,
+            'is_force_update': is_force_update,
+            'is_supported': is_supported,
+            'update_url': download_url,
+            'changelog': data.get('release_notes', ''),
+            'release_date': data.get('created_at', '')
+        }
+    
+    def _read_cached_version(self):
+        """
+        读取本地版本缓存
+        缓存格式: {'fetched_at': 时间戳, 'data': 服务端版本数据}
+        缓存不存在或已过期时返回None
+        """
+        if CACHE_DISABLED:
+            return None
+        
+        try:
+            with open(VERSION_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
             
-            debug_log(f"版本比较结果: is_latest={is_latest}, is_supported={is_supported}")
+            if time.time() - cached.get('fetched_at', 0) >= VERSION_CACHE_TTL:
+                debug_log("版本缓存已过期")
+                return None
             
-            return {
-                'is_latest': is_latest,
-                'current_version': VERSION,
-                'latest_version': latest_version,
-                'is_force_update': is_force_update,
-                'is_supported': is_supported,
-                'update_url': download_url,
-                'changelog': data.get('release_notes', ''),
-                'release_date': data.get('created_at', '')
-            }
+            debug_log(f"使用本地版本缓存: {VERSION_CACHE_FILE}")
+            return cached.get('data')
+        except FileNotFoundError:
+            return None
         except Exception as e:
-            debug_log(f"版本检查异常: {e}")
+            debug_log(f"读取版本缓存失败: {e}")
             return None
     
+    def _write_cached_version(self, data):
+        """将服务端版本数据原子写入本地缓存"""
+        tmp_path = VERSION_CACHE_FILE + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': time.time(), 'data': data}, f, ensure_ascii=False)
+            os.replace(tmp_path, VERSION_CACHE_FILE)
+            debug_log(f"版本信息已缓存: {VERSION_CACHE_FILE}")
+        except Exception as e:
+            debug_log(f"写入版本缓存失败: {e}")
+    
     def _compare_version(self, v1, v2):
         """
         比较两个版本号
         返回: 1 (v1 > v2), -1 (v1 < v2), 0 (v1 == v2)
         """
-        def parse_version(v):
-            parts = v.replace('v', '').split('.')
-            return [int(p) for p in parts[:3]]  # 只取主要版本号
-        
         try:
-            p1 = parse_version(v1)
-            p2 = parse_version(v2)
+            p1 = _parse_version(v1)
+            p2 = _parse_version(v2)
             
             for a, b in zip(p1, p2):
                 if a > b:
@@ -165,6 +393,13 @@ class VersionClient(BackendClient):
 class AdsClient(BackendClient):
     """赞助信息客户端"""
     
+    ADS_MEMORY_TTL = 300  # 内存缓存有效期（秒）
+    
+    def __init__(self):
+        super().__init__()
+        self._groups = None
+        self._groups_ts = 0
+    
     def get_ads(self, ad_type=None):
         """
         获取赞助信息列表
@@ -181,32 +416,18 @@ class AdsClient(BackendClient):
         ]
         """
         try:
-            params = {}
-            if ad_type:
-                params['type'] = ad_type
-            
-            result = self._make_request('GET', '/api/ads', params)
-            
-            if not result or not result.get('success'):
-                debug_log(f"获取赞助信息失败: {result}")
+            groups = self._load_ad_groups()
+            if groups is None:
                 return []
             
-            # 后端返回按类型分组的数组
-            data = result.get('data', [])
-            
             # 如果指定了类型，只返回该类型的赞助信息
-            if ad_type and data:
-                for group in data:
-                    if group.get('type_code') == ad_type:
-                        ads = group.get('ads', [])
-                        debug_log(f"获取到 {len(ads)} 条 {ad_type} 赞助信息")
-                        return ads
-                return []
+            if ad_type:
+                ads = groups.get(ad_type, [])
+                debug_log(f"获取到 {len(ads)} 条 {ad_type} 赞助信息")
+                return ads
             
             # 否则返回所有赞助信息（合并所有类型）
-            all_ads = []
-            for group in data:
-                all_ads.extend(group.get('ads', []))
+            all_ads = list(itertools.chain.from_iterable(groups.values()))
             
             debug_log(f"获取到 {len(all_ads)} 条赞助信息")
             return all_ads
@@ -215,6 +436,85 @@ class AdsClient(BackendClient):
             debug_log(f"获取赞助信息异常: {e}")
             return []
     
+    def _load_ad_groups(self):
+        """
+        获取按类型分组的赞助信息 {type_code: [ads]}
+        一次请求取回全部类型并在内存中缓存 ADS_MEMORY_TTL 秒，不同类型的查询共用同一份数据
+        """
+        now = time.time()
+        if self._groups is not None and now - self._groups_ts < self.ADS_MEMORY_TTL:
+            return self._groups
+        
+        data = self._fetch_ads_data({})
+        if data is None:
+            return None
+        
+        self._groups = {group.get('type_code'): group.get('ads', []) for group in data}
+        self._groups_ts = now
+        return self._groups
+    
+    def _fetch_ads_data(self, params):
+        """
+        获取赞助信息分组数据，优先使用本地缓存
+        缓存文件以请求参数的哈希命名，过期后重新请求；请求失败时退回使用过期缓存
+        """
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        cache_path = os.path.join(ADS_CACHE_DIR, f"{key}.json")
+        cached = None
+        
+        if not CACHE_DISABLED:
+            self._prune_ads_cache()
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if time.time() < cached.get('expires_at', 0):
+                    debug_log(f"使用本地赞助信息缓存: {cache_path}")
+                    return cached.get('data', [])
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                debug_log(f"读取赞助信息缓存失败: {e}")
+                cached = None
+        
+        result = self._make_request('GET', _URL_ADS, params)
+        
+        if not result or not result.get('success'):
+            debug_log(f"获取赞助信息失败: {result}")
+            if cached:
+                debug_log("使用过期的赞助信息缓存")
+                return cached.get('data', [])
+            return None
+        
+        data = result.get('data', [])
+        if not CACHE_DISABLED:
+            tmp_path = cache_path + '.tmp'
+            try:
+                os.makedirs(ADS_CACHE_DIR, exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'expires_at': time.time() + ADS_CACHE_TTL, 'data': data}, f, ensure_ascii=False)
+                os.replace(tmp_path, cache_path)
+            except Exception as e:
+                debug_log(f"写入赞助信息缓存失败: {e}")
+        return data
+    
+    def _prune_ads_cache(self):
+        """清理长期未更新的赞助信息缓存文件（每次运行只执行一次）"""
+        if getattr(self, '_ads_cache_pruned', False):
+            return
+        self._ads_cache_pruned = True
+        
+        cutoff = time.time() - ADS_CACHE_MAX_AGE
+        try:
+            with os.scandir(ADS_CACHE_DIR) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        debug_log(f"已清理过期赞助信息缓存: {entry.name}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            debug_log(f"清理赞助信息缓存失败: {e}")
+    
     def get_after_action_ads(self):
         """获取操作后公告信息"""
         return self.get_ads(ad_type='after_action')
@@ -228,3 +528,15 @@ class AdsClient(BackendClient):
 telemetry = TelemetryClient()
 version_client = VersionClient()
 ads_client = AdsClient()
+
+
+def fetch_startup_info():
+    """
+    并行获取启动阶段需要的版本信息与操作后公告
+    两个请求共用后端会话的连接池，总耗时取两者中较长的一个
+    返回: (version_info, after_action_ads)
+    """
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup-info") as executor:
+        version_future = executor.submit(version_client.check_version)
+        ads_future = executor.submit(ads_client.get_after_action_ads)
+        return version_future.result(), ads_future.result()
@@ -7,6 +7,7 @@ FF14DCT 浏览器模块
 
 import time
 import webbrowser
+from urllib.parse import urlsplit
 
 # 尝试导入selenium
 try:
@@ -14,29 +15,105 @@ try:
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
 
 from .config import (
-    ConfigManager, FF14_LOGIN_URL, DEBUG_MODE,
-    USE_HTTP_PROXY, HTTP_PROXY
+    ConfigManager, FF14_LOGIN_URL, FF14_BASE_URL, DEBUG_MODE,
+    get_system_proxy, parsed_proxy
 )
 from .logger import debug_log
 
+# 接口所在主机，同名Cookie冲突时优先保留对该主机生效的Cookie
+_API_HOST = urlsplit(FF14_BASE_URL).hostname
+
+
+def _is_sdo_domain(domain):
+    """判断Cookie域是否为 sdo.com 或其子域（排除 evilsdo.com 之类的相似域名）"""
+    d = domain.lstrip('.').lower()
+    return d == 'sdo.com' or d.endswith('.sdo.com')
+
+
+def _cookie_priority(cookie):
+    """
+    同名Cookie的优先级：域名与接口主机完全一致 > 对接口主机生效的父域 > 其他子域
+    同级时域名越具体优先级越高
+    """
+    d = cookie.get('domain', '').lstrip('.').lower()
+    if d == _API_HOST:
+        return (2, len(d))
+    if _API_HOST.endswith('.' + d):
+        return (1, len(d))
+    return (0, len(d))
+
+
+def _to_locators(selectors):
+    """将选择器字符串转换为 (By, selector) 定位元组（以 // 开头的为XPath）"""
+    if not SELENIUM_AVAILABLE:
+        return ()
+    return tuple(
+        (By.XPATH if selector.startswith("//") else By.CSS_SELECTOR, selector)
+        for selector in selectors
+    )
+
 
 class BrowserManager:
     """浏览器管理器"""
     
+    # 登录页遮罩层选择器（以 // 开头的为XPath，其余为CSS选择器）
+    MODAL_SELECTORS = (
+        ".modal-backdrop",
+        ".ant-modal-mask",
+        ".ant-modal-wrap",
+        "//div[contains(@class, 'modal-backdrop')]",
+        "//div[contains(@class, 'ant-modal-mask')]",
+    )
+    
+    # 登录按钮选择器，按顺序尝试
+    LOGIN_BUTTON_SELECTORS = (
+        "//button[contains(@class, 'ant-btn') and contains(@class, 'blueButton')]//span[contains(text(), '登')]/..",
+        "//button[contains(text(), '登')]",
+        "//span[contains(text(), '登 录')]/parent::button",
+        ".ant-btn.blueButton.ant-btn-primary",
+    )
+    
+    # 页面脚本不可用时逐个查找元素所用的定位元组
+    _MODAL_LOCATORS = _to_locators(MODAL_SELECTORS)
+    _LOGIN_LOCATORS = _to_locators(LOGIN_BUTTON_SELECTORS)
+    
+    # 页面内执行：先查找可见的遮罩层，没有遮罩层时点击第一个匹配的登录按钮
+    # 返回 {modal: 命中的遮罩层选择器或null, clicked: 点击的按钮选择器或null}
+    _LOGIN_PROBE_SCRIPT = """
+        const find = (sel) => sel.startsWith('//')
+            ? document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+            : document.querySelector(sel);
+        for (const sel of arguments[0]) {
+            const el = find(sel);
+            if (el && el.getClientRects().length > 0) {
+                return {modal: sel, clicked: null};
+            }
+        }
+        for (const sel of arguments[1]) {
+            const el = find(sel);
+            if (el) {
+                el.click();
+                return {modal: null, clicked: sel};
+            }
+        }
+        return {modal: null, clicked: null};
+    """
+    
     def __init__(self, config_manager=None):
         self.driver = None
         self.config = config_manager or ConfigManager()
         self.default_browser = self.config.get_browser()
         
         # 记录代理设置（如果启用）
-        if USE_HTTP_PROXY and HTTP_PROXY:
-            debug_log(f"浏览器将使用HTTP代理: {HTTP_PROXY}")
+        use_proxy, http_proxy = get_system_proxy()
+        if use_proxy and http_proxy:
+            debug_log(f"浏览器将使用HTTP代理: {http_proxy}")
     
     def init_browser(self):
         """初始化浏览器，询问用户选择"""
@@ -165,8 +242,9 @@ class BrowserManager:
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
             options.add_experimental_option('useAutomationExtension', False)
             
-            if USE_HTTP_PROXY and HTTP_PROXY:
-                options.add_argument(f'--proxy-server={HTTP_PROXY}')
+            use_proxy, http_proxy = get_system_proxy()
+            if use_proxy and http_proxy:
+                options.add_argument(f'--proxy-server={http_proxy}')
             
             if not DEBUG_MODE:
                 options.add_argument('--log-level=3')
@@ -194,8 +272,9 @@ class BrowserManager:
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
             options.add_experimental_option('useAutomationExtension', False)
             
-            if USE_HTTP_PROXY and HTTP_PROXY:
-                options.add_argument(f'--proxy-server={HTTP_PROXY}')
+            use_proxy, http_proxy = get_system_proxy()
+            if use_proxy and http_proxy:
+                options.add_argument(f'--proxy-server={http_proxy}')
             
             if not DEBUG_MODE:
                 options.add_argument('--log-level=3')
@@ -221,15 +300,15 @@ class BrowserManager:
             options.set_preference("dom.webdriver.enabled", False)
             options.set_preference('useAutomationExtension', False)
             
-            if USE_HTTP_PROXY and HTTP_PROXY:
-                # 解析代理设置
-                proxy_parts = HTTP_PROXY.replace('http://', '').split(':')
-                if len(proxy_parts) == 2:
-                    options.set_preference("network.proxy.type", 1)
-                    options.set_preference("network.proxy.http", proxy_parts[0])
-                    options.set_preference("network.proxy.http_port", int(proxy_parts[1]))
-                    options.set_preference("network.proxy.ssl", proxy_parts[0])
-                    options.set_preference("network.proxy.ssl_port", int(proxy_parts[1]))
+            use_proxy, http_proxy = get_system_proxy()
+            proxy_addr = parsed_proxy(http_proxy) if use_proxy and http_proxy else None
+            if proxy_addr:
+                proxy_host, proxy_port = proxy_addr
+                options.set_preference("network.proxy.type", 1)
+                options.set_preference("network.proxy.http", proxy_host)
+                options.set_preference("network.proxy.http_port", proxy_port)
+                options.set_preference("network.proxy.ssl", proxy_host)
+                options.set_preference("network.proxy.ssl_port", proxy_port)
             
             self.driver = webdriver.Firefox(options=options)
             
@@ -261,73 +340,34 @@ class BrowserManager:
             return False
     
     def _click_login_button(self):
-        """自动点击登录按钮"""
+        """
+        自动点击登录按钮
+        遮罩层检查与登录按钮查找点击合并为一次页面内脚本调用，避免逐个选择器往返WebDriver
+        """
         if not self.driver:
             print("[提示] 请在浏览器中手动点击登录按钮")
             return
         
         try:
-            # 首先检查是否存在遮罩层
-            has_modal = False
-            modal_check_selectors = [
-                ".modal-backdrop",
-                ".ant-modal-mask",
-                ".ant-modal-wrap",
-                "//div[contains(@class, 'modal-backdrop')]",
-                "//div[contains(@class, 'ant-modal-mask')]",
-            ]
-            
-            for selector in modal_check_selectors:
-                try:
-                    if selector.startswith("//"):
-                        element = self.driver.find_element(By.XPATH, selector)
-                    else:
-                        element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    
-                    # 检查元素是否可见
-                    if element.is_displayed():
-                        has_modal = True
-                        debug_log(f"检测到遮罩层: {selector}")
-                        break
-                except NoSuchElementException:
-                    continue
-                except Exception as e:
-                    debug_log(f"检查遮罩层时出错 ({selector}): {e}")
-                    continue
+            try:
+                result = self.driver.execute_script(
+                    self._LOGIN_PROBE_SCRIPT,
+                    list(self.MODAL_SELECTORS),
+                    list(self.LOGIN_BUTTON_SELECTORS),
+                ) or {}
+            except Exception as e:
+                debug_log(f"页面脚本检测失败，改为逐个查找元素: {e}")
+                result = self._probe_login_with_locators()
             
-            if has_modal:
+            if result.get('modal'):
+                debug_log(f"检测到遮罩层: {result['modal']}")
                 debug_log("[DEBUG] 检测到页面遮罩层，跳过自动点击登录按钮")
                 return
             
-            # 未检测到遮罩层，尝试查找并点击登录按钮
-            debug_log("未检测到遮罩层，尝试自动点击登录按钮")
-            login_button_selectors = [
-                "//button[contains(@class, 'ant-btn') and contains(@class, 'blueButton')]//span[contains(text(), '登')]/..",
-                "//button[contains(text(), '登')]",
-                "//span[contains(text(), '登 录')]/parent::button",
-                ".ant-btn.blueButton.ant-btn-primary"
-            ]
-            
-            for selector in login_button_selectors:
-                try:
-                    if selector.startswith("//"):
-                        button = self.driver.find_element(By.XPATH, selector)
-                    else:
-                        button = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    
-                    # 使用JavaScript点击来避免元素被遮挡的问题
-                    self.driver.execute_script("arguments[0].click();", button)
-                    print("[信息] 已自动点击登录按钮，请在浏览器中完成登录")
-                    return
-                except NoSuchElementException:
-                    continue
-                except ElementClickInterceptedException:
-                    try:
-                        self.driver.execute_script("arguments[0].click();", button)
-                        print("[信息] 已自动点击登录按钮，请在浏览器中完成登录")
-                        return
-                    except:
-                        continue
+            if result.get('clicked'):
+                debug_log(f"未检测到遮罩层，已点击登录按钮: {result['clicked']}")
+                print("[信息] 已自动点击登录按钮，请在浏览器中完成登录")
+                return
             
             print("[提示] 未找到登录按钮，可能已经登录或页面结构变化")
             print("[提示] 请检查浏览器页面状态")
@@ -336,46 +376,91 @@ class BrowserManager:
             debug_log(f"点击登录按钮详细错误: {e}")
             print(f"[提示] 请手动点击登录按钮完成登录")
     
+    def _probe_login_with_locators(self):
+        """
+        逐个定位元素完成遮罩层检查和登录按钮点击（页面脚本执行失败时的回退方案）
+        返回值格式与 _LOGIN_PROBE_SCRIPT 相同
+        """
+        for by, selector in self._MODAL_LOCATORS:
+            try:
+                if self.driver.find_element(by, selector).is_displayed():
+                    return {'modal': selector, 'clicked': None}
+            except NoSuchElementException:
+                continue
+            except Exception as e:
+                debug_log(f"检查遮罩层时出错 ({selector}): {e}")
+        
+        for by, selector in self._LOGIN_LOCATORS:
+            try:
+                button = self.driver.find_element(by, selector)
+                # 使用JavaScript点击来避免元素被遮挡的问题
+                self.driver.execute_script("arguments[0].click();", button)
+                return {'modal': None, 'clicked': selector}
+            except NoSuchElementException:
+                continue
+            except Exception as e:
+                debug_log(f"点击登录按钮时出错 ({selector}): {e}")
+        
+        return {'modal': None, 'clicked': None}
+    
     def wait_for_login(self, timeout=300):
-        """等待用户完成登录"""
+        """
+        等待用户完成登录
+        每0.5秒在页面内用一次脚本检查 document.cookie 与当前地址；
+        HttpOnly 的Cookie脚本读不到，因此每2秒再通过WebDriver读取一次Cookie名称兜底
+        """
         if not self.driver:
             return False
         
         print("[信息] 请在浏览器中完成登录...")
         print("[信息] 登录成功后会自动检测并继续")
         
-        start_time = time.time()
+        # SDO登录后会有这些Cookie
+        login_indicators = ('STID', 'tgc', 'sdoId')
+        polls = [0]
+        detected = {}
         
-        while time.time() - start_time < timeout:
+        def login_detected(driver):
             try:
-                # 检查登录状态的Cookie
-                cookies = self.driver.get_cookies()
-                cookie_names = [c['name'] for c in cookies]
+                state = driver.execute_script(
+                    "return {href: location.href, cookie: document.cookie};"
+                )
+                cookie_str = state.get('cookie', '')
+                current_url = state.get('href', '')
                 
-                # SDO登录后会有这些Cookie
-                login_indicators = ['STID', 'tgc', 'sdoId']
+                indicator = next((name for name in login_indicators if f"{name}=" in cookie_str), None)
                 
-                for indicator in login_indicators:
-                    if indicator in cookie_names:
-                        debug_log(f"检测到登录Cookie: {indicator}")
-                        print("[成功] 检测到登录状态")
-                        return True
+                polls[0] += 1
+                if indicator is None and polls[0] % 4 == 0:
+                    cookie_names = {c['name'] for c in driver.get_cookies()}
+                    indicator = next((name for name in login_indicators if name in cookie_names), None)
+                
+                if indicator:
+                    detected['cookie'] = indicator
+                    return True
                 
                 # 也可以检查页面元素变化
-                current_url = self.driver.current_url
                 if 'login' not in current_url.lower() and 'ff14bjz.sdo.com' in current_url:
-                    debug_log(f"页面已跳转: {current_url}")
-                    print("[成功] 检测到页面跳转，登录可能已完成")
-                    time.sleep(2)  # 等待Cookie完全设置
+                    detected['url'] = current_url
                     return True
-                
             except Exception as e:
                 debug_log(f"检查登录状态时出错: {e}")
-            
-            time.sleep(2)  # 每2秒检查一次
+            return False
         
-        print("[错误] 登录超时")
-        return False
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.5).until(login_detected)
+        except TimeoutException:
+            print("[错误] 登录超时")
+            return False
+        
+        if 'cookie' in detected:
+            debug_log(f"检测到登录Cookie: {detected['cookie']}")
+            print("[成功] 检测到登录状态")
+        else:
+            debug_log(f"页面已跳转: {detected['url']}")
+            print("[成功] 检测到页面跳转，登录可能已完成")
+            time.sleep(2)  # 等待Cookie完全设置
+        return True
     
     def get_cookies(self):
         """获取当前所有Cookie"""
@@ -383,10 +468,14 @@ class BrowserManager:
             return {}
         
         try:
-            cookies = self.driver.get_cookies()
-            cookie_dict = {}
-            for cookie in cookies:
-                cookie_dict[cookie['name']] = cookie['value']
+            cookies = self._get_cookies_via_cdp()
+            if cookies is None:
+                cookies = self.driver.get_cookies()
+            else:
+                # 不同子域可能存在同名Cookie（如 JSESSIONID），按优先级升序排列，
+                # 构建字典时优先级高的覆盖低的，保证回放到接口的是接口主机的Cookie
+                cookies = sorted(cookies, key=_cookie_priority)
+            cookie_dict = {cookie['name']: cookie['value'] for cookie in cookies}
             
             debug_log(f"获取到 {len(cookie_dict)} 个Cookie")
             return cookie_dict
@@ -395,19 +484,33 @@ class BrowserManager:
             print(f"[错误] 获取Cookie失败: {e}")
             return {}
     
-    def get_sdo_cookies(self):
-        """获取SDO相关的Cookie"""
-        all_cookies = self.get_cookies()
-        
-        # SDO登录相关的重要Cookie
-        important_keys = ['STID', 'tgc', 'sdoId', 'sessionId', 'JSESSIONID']
-        sdo_cookies = {}
+    def _get_cookies_via_cdp(self):
+        """
+        通过 DevTools 协议一次性读取浏览器中 sdo.com 域下的所有Cookie
+        driver.get_cookies() 只返回当前页面所在域的Cookie，登录跳转到子域后可能缺失；
+        仅 Chrome/Edge 支持，其他浏览器或调用失败时返回 None
+        """
+        execute_cdp_cmd = getattr(self.driver, 'execute_cdp_cmd', None)
+        if execute_cdp_cmd is None:
+            return None
         
-        for key in all_cookies:
-            # 保留所有Cookie，但标记重要的
-            sdo_cookies[key] = all_cookies[key]
+        try:
+            result = execute_cdp_cmd('Network.getAllCookies', {})
+        except Exception as e:
+            debug_log(f"CDP获取Cookie失败，回退到WebDriver接口: {e}")
+            return None
         
-        return sdo_cookies
+        return [
+            cookie for cookie in result.get('cookies', [])
+            if _is_sdo_domain(cookie.get('domain', ''))
+        ]
+    
+    def get_sdo_cookies(self):
+        """
+        获取SDO相关的Cookie
+        登录态依赖的Cookie（STID、tgc、sdoId、sessionId、JSESSIONID 等）不止一个，保留全部Cookie
+        """
+        return self.get_cookies()
     
     def close(self):
         """关闭浏览器"""
@@ -6,9 +6,10 @@ FF14DCT 配置管理模块
 """
 
 import os
-import json
-import winreg
+import functools
 from datetime import datetime
+from urllib.parse import urlsplit
+from .json_codec import json_loads, json_dumps
 
 # ==================== 版本信息 ====================
 VERSION = "0.2.0"
@@ -43,11 +44,6 @@ FF14_API_MIGRATION_ORDERS = f"{FF14_BASE_URL}/api/orderserivce/queryMigrationOrd
 # ==================== HTTP配置 ====================
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
 
-# HTTP代理配置（初始值，将被自动检测覆盖）
-USE_HTTP_PROXY = False
-HTTP_PROXY = None
-
-
 def detect_system_proxy():
     """
     检测系统HTTP代理设置
@@ -67,53 +63,44 @@ def detect_system_proxy():
     try:
         import platform
         if platform.system() == 'Windows':
-            # 访问Internet Settings注册表项
-            key = winreg.OpenKey(
+            import winreg
+            
+            # 访问Internet Settings注册表项（离开 with 块时自动关闭）
+            with winreg.OpenKey(
                 winreg.HKEY_CURRENT_USER,
                 r"Software\Microsoft\Windows\CurrentVersion\Internet Settings",
                 0,
                 winreg.KEY_READ
-            )
-            
-            # 检查是否启用代理
-            try:
-                proxy_enable, _ = winreg.QueryValueEx(key, "ProxyEnable")
-            except FileNotFoundError:
-                proxy_enable = 0
-            
-            # 如果启用了代理，获取代理服务器地址
-            if proxy_enable:
+            ) as key:
+                # 检查是否启用代理，并获取代理服务器地址
                 try:
+                    proxy_enable, _ = winreg.QueryValueEx(key, "ProxyEnable")
+                    if not proxy_enable:
+                        return False, None
                     proxy_server, _ = winreg.QueryValueEx(key, "ProxyServer")
-                    winreg.CloseKey(key)
-                    
-                    # 处理代理服务器地址格式
-                    # 可能的格式: "127.0.0.1:7890" 或 "http=127.0.0.1:7890;https=127.0.0.1:7890"
-                    if '=' in proxy_server:
-                        # 多协议代理，提取http代理
-                        for part in proxy_server.split(';'):
-                            if part.startswith('http='):
-                                proxy_server = part.split('=', 1)[1]
-                                break
-                            elif part.startswith('https='):
-                                proxy_server = part.split('=', 1)[1]
-                                break
-                    
-                    # 确保代理地址有协议前缀
-                    if not proxy_server.startswith('http://') and not proxy_server.startswith('https://'):
-                        proxy_server = f"http://{proxy_server}"
-                    
-                    if DEBUG_MODE:
-                        print(f"[DEBUG] 检测到Windows系统代理: {proxy_server}")
-                    
-                    return True, proxy_server
                 except FileNotFoundError:
-                    pass
-                finally:
-                    try:
-                        winreg.CloseKey(key)
-                    except:
-                        pass
+                    return False, None
+            
+            # 处理代理服务器地址格式
+            # 可能的格式: "127.0.0.1:7890" 或 "http=127.0.0.1:7890;https=127.0.0.1:7890"
+            if '=' in proxy_server:
+                # 多协议代理，提取http代理
+                for part in proxy_server.split(';'):
+                    if part.startswith('http='):
+                        proxy_server = part.split('=', 1)[1]
+                        break
+                    elif part.startswith('https='):
+                        proxy_server = part.split('=', 1)[1]
+                        break
+            
+            # 确保代理地址有协议前缀
+            if not proxy_server.startswith('http://') and not proxy_server.startswith('https://'):
+                proxy_server = f"http://{proxy_server}"
+            
+            if DEBUG_MODE:
+                print(f"[DEBUG] 检测到Windows系统代理: {proxy_server}")
+            
+            return True, proxy_server
     except ImportError:
         # 非Windows系统，winreg不可用
         pass
@@ -124,22 +111,70 @@ def detect_system_proxy():
     return False, None
 
 
-# 初始化时自动检测代理
-USE_HTTP_PROXY, HTTP_PROXY = detect_system_proxy()
+@functools.lru_cache(maxsize=1)
+def get_system_proxy():
+    """
+    获取系统HTTP代理设置（首次调用时检测，之后在进程内复用结果）
+    返回: (use_proxy: bool, proxy_url: str or None)
+    """
+    return detect_system_proxy()
+
+
+@functools.lru_cache(maxsize=4)
+def parsed_proxy(url):
+    """
+    解析代理地址为 (host, port)
+    支持带或不带协议前缀、带认证信息的地址；无法解析出主机和端口时返回None
+    """
+    try:
+        parts = urlsplit(url if '://' in url else f"http://{url}")
+        if parts.hostname and parts.port:
+            return parts.hostname, parts.port
+    except ValueError:
+        pass
+    return None
+
+
+def __getattr__(name):
+    """兼容旧代码直接读取 USE_HTTP_PROXY / HTTP_PROXY 模块属性"""
+    if name == 'USE_HTTP_PROXY':
+        return get_system_proxy()[0]
+    if name == 'HTTP_PROXY':
+        return get_system_proxy()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ==================== 文件路径 ====================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 CONFIG_FILE = os.path.join(BASE_DIR, "FF14_DCT_Config.json")
 LOG_TRANSFER_HISTORY_FILE = os.path.join(LOG_DIR, "transfer_history.log")
+VERSION_CACHE_FILE = os.path.join(BASE_DIR, ".version_cache.json")
+AREA_CACHE_FILE = os.path.join(BASE_DIR, ".area_cache.json")
+RETURN_AREA_CACHE_FILE = os.path.join(BASE_DIR, ".return_area_cache.json")
+ADS_CACHE_DIR = os.path.join(BASE_DIR, ".ads")
+
+# ==================== 本地缓存配置 ====================
+# 设置环境变量 FF14DCT_NOCACHE=1 可禁用本地缓存（强制走网络请求）
+CACHE_DISABLED = os.environ.get('FF14DCT_NOCACHE') == '1'
+VERSION_CACHE_TTL = 24 * 60 * 60  # 版本检查结果缓存有效期（秒）
+ADS_CACHE_TTL = 60 * 60  # 赞助信息缓存有效期（秒）
+ADS_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # 超过该时长未更新的赞助信息缓存文件会被清理（秒）
+AREA_LIST_TTL = 5 * 60  # 区服列表内存缓存有效期（秒）
 
 
 class ConfigManager:
     """配置文件管理器"""
     
+    # 已加载的配置 {配置文件路径: 配置字典}
+    # 同一路径的多个实例共用一份配置，只读取一次文件，且修改对所有实例可见
+    _loaded_configs = {}
+    
     def __init__(self, config_path=None):
         self.config_path = config_path or CONFIG_FILE
-        self.config = self._load_config()
+        config = self._loaded_configs.get(self.config_path)
+        if config is None:
+            config = self._loaded_configs[self.config_path] = self._load_config()
+        self.config = config
     
     def _load_config(self):
         """加载配置文件"""
@@ -150,8 +185,8 @@ class ConfigManager:
         
         try:
             if os.path.exists(self.config_path):
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    loaded = json.load(f)
+                with open(self.config_path, 'rb') as f:
+                    loaded = json_loads(f.read())
                     # 合并默认配置和加载的配置
                     default_config.update(loaded)
         except Exception as e:
@@ -168,8 +203,12 @@ class ConfigManager:
             if config_dir and not os.path.exists(config_dir):
                 os.makedirs(config_dir, exist_ok=True)
             
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            # 先写临时文件再替换，写入中断时不会留下损坏的配置文件
+            tmp_path = self.config_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                # 配置文件可能由用户手动编辑，始终使用2空格缩进
+                f.write(json_dumps(self.config, indent=True))
+            os.replace(tmp_path, self.config_path)
             return True
         except Exception as e:
             if DEBUG_MODE:
@@ -181,7 +220,9 @@ class ConfigManager:
         return self.config.get(key, default)
     
     def set(self, key, value):
-        """设置配置项并保存"""
+        """设置配置项并保存（值未变化时不重写文件）"""
+        if key in self.config and self.config[key] == value:
+            return True
         self.config[key] = value
         return self._save_config()
     
@@ -193,6 +234,16 @@ class ConfigManager:
         """设置默认浏览器"""
         return self.set("default_browser", browser_name)
     
+    def get_max_transfer_attempts(self, default):
+        """
+        获取跨区传送最多尝试次数（配置项 max_transfer_attempts，0表示不限）
+        未配置或配置值无效时返回 default
+        """
+        value = self.get("max_transfer_attempts")
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            return default
+        return value
+    
     def get_last_transfer(self):
         """获取上次传送记录"""
         return self.get("last_transfer")
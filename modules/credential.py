@@ -7,22 +7,54 @@ FF14DCT 凭据管理模块
 Windows测试可在运行窗口输入 rundll32.exe keymgr.dll,KRShowKeyMgr 开启凭据管理器
 """
 
-import json
-import keyring
+import zlib
+import base64
 from .config import DEBUG_MODE, APP_NAME
 from .logger import debug_log
+from .json_codec import json_loads, json_dumps, JSONDecodeError
 
 # 密钥环服务名称
 KEYRING_SERVICE = "FF14DCT"
 KEYRING_USERNAME = "sdo_cookies"
 
+# 压缩存储格式前缀（旧版本直接存储JSON字符串，以 "{" 开头）
+_COMPRESSED_PREFIX = "Z:"
+
+# 缓存未初始化的标记（None 表示密钥环中确实没有保存的Cookies）
+_NOT_LOADED = object()
+
+
+def _encode_cookies(cookies_dict):
+    """
+    将Cookies字典编码为密钥环存储字符串
+    压缩后(zlib+base64)更短时使用 "Z:" 前缀的压缩格式，否则保留JSON原文
+    （Windows凭据管理器单条凭据上限约2560字节）
+    """
+    raw = json_dumps(cookies_dict)
+    packed = _COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw, 9)).decode('ascii')
+    if len(packed) < len(raw):
+        return packed
+    return raw.decode('utf-8')
+
+
+def _decode_cookies(stored):
+    """解码密钥环中的Cookies字符串，兼容旧版JSON格式"""
+    if stored.startswith(_COMPRESSED_PREFIX):
+        return json_loads(zlib.decompress(base64.b64decode(stored[len(_COMPRESSED_PREFIX):])))
+    return json_loads(stored)
+
 
 class CredentialManager:
-    """凭据管理器 - 使用系统密钥环安全存储Cookies"""
+    """
+    凭据管理器 - 使用系统密钥环安全存储Cookies
+    keyring 在 Windows 上会加载凭据管理器相关DLL，各方法内首次访问密钥环时才导入
+    """
     
     def __init__(self):
         self.service = KEYRING_SERVICE
         self.username = KEYRING_USERNAME
+        # 已读取的Cookies缓存，避免重复访问系统凭据存储
+        self._cache = _NOT_LOADED
     
     def save_cookies(self, cookies_dict):
         """
@@ -39,11 +71,13 @@ class CredentialManager:
                 debug_log("Cookies为空，不保存")
                 return False
             
-            # 将Cookies字典序列化为JSON字符串
-            cookies_json = json.dumps(cookies_dict, ensure_ascii=False)
+            # 将Cookies字典序列化为存储字符串（必要时压缩）
+            cookies_data = _encode_cookies(cookies_dict)
             
             # 保存到密钥环
-            keyring.set_password(self.service, self.username, cookies_json)
+            import keyring
+            keyring.set_password(self.service, self.username, cookies_data)
+            self._cache = dict(cookies_dict)
             
             debug_log(f"已保存 {len(cookies_dict)} 个Cookies到系统密钥环")
             return True
@@ -61,22 +95,28 @@ class CredentialManager:
         Returns:
             dict or None: Cookie字典，如果不存在或加载失败则返回None
         """
+        if self._cache is not _NOT_LOADED:
+            return dict(self._cache) if self._cache is not None else None
+        
         try:
             # 从密钥环读取
-            cookies_json = keyring.get_password(self.service, self.username)
+            import keyring
+            cookies_data = keyring.get_password(self.service, self.username)
             
-            if cookies_json is None:
+            if cookies_data is None:
                 debug_log("密钥环中没有保存的Cookies")
+                self._cache = None
                 return None
             
-            # 反序列化JSON字符串
-            cookies_dict = json.loads(cookies_json)
+            # 反序列化存储字符串（兼容旧版JSON格式）
+            cookies_dict = _decode_cookies(cookies_data)
+            self._cache = cookies_dict
             
             debug_log(f"从密钥环加载了 {len(cookies_dict)} 个Cookies")
-            return cookies_dict
+            return dict(cookies_dict)
             
-        except json.JSONDecodeError as e:
-            debug_log(f"Cookies JSON解析失败: {e}")
+        except (JSONDecodeError, zlib.error, ValueError) as e:
+            debug_log(f"Cookies解析失败: {e}")
             return None
         except Exception as e:
             debug_log(f"从密钥环加载Cookies失败: {e}")
@@ -91,12 +131,16 @@ class CredentialManager:
         Returns:
             bool: 删除是否成功
         """
+        import keyring
+        from keyring.errors import PasswordDeleteError
         try:
             keyring.delete_password(self.service, self.username)
+            self._cache = None
             debug_log("已从密钥环删除Cookies")
             return True
-        except keyring.errors.PasswordDeleteError:
+        except PasswordDeleteError:
             # 密码不存在，也算删除成功
+            self._cache = None
             debug_log("密钥环中没有Cookies可删除")
             return True
         except Exception as e:
@@ -112,11 +156,7 @@ class CredentialManager:
         Returns:
             bool: 是否有保存的Cookies
         """
-        try:
-            cookies_json = keyring.get_password(self.service, self.username)
-            return cookies_json is not None
-        except Exception:
-            return False
+        return self.load_cookies() is not None
 
 
 # 全局凭据管理器实例
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FF14DCT JSON编解码模块
+优先使用 orjson（C实现，解析速度更快），未安装时回退到标准库 json
+"""
+
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# orjson.JSONDecodeError 继承自 json.JSONDecodeError，调用方统一捕获此异常即可
+JSONDecodeError = json.JSONDecodeError
+
+
+def json_loads(data):
+    """解析JSON，data 可以是 str 或 bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj, indent=False):
+    """
+    序列化为UTF-8编码的JSON字节串（非ASCII字符原样输出）
+    indent=True 时使用2空格缩进，否则输出紧凑格式
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
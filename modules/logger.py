@@ -6,17 +6,91 @@ FF14DCT 日志模块
 """
 
 import os
-import json
+import re
+import time
+import queue
 import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from .config import DEBUG_MODE, LOG_DIR, LOG_TRANSFER_HISTORY_FILE, APP_NAME
+from .json_codec import json_loads, json_dumps
 
 
-# 日志文件句柄（全局变量）
-_log_file = None
+# 日志文件写入器（全局变量）
+# 调用方只把日志记录放入队列，文件I/O由后台线程完成
+_file_logger = None
+_log_listener = None
 _log_file_path = None
 
 
+class _BufferedFileHandler(logging.Handler):
+    """
+    带写缓冲的日志文件处理器
+    日志行编码为UTF-8字节后暂存在内存中，由后台每秒（或缓冲满时）合并为一次 os.write
+    写入以 O_APPEND 打开的文件描述符，不经过Python文件对象的编码和缓冲层
+    """
+    
+    BUFFER_SIZE = 64 * 1024
+    FLUSH_INTERVAL = 1.0
+    
+    def __init__(self, filename):
+        super().__init__()
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(filename, flags, 0o644)
+        self._chunks = []
+        self._pending = 0
+        self._stop_event = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True, name="log-flush")
+        self._flush_thread.start()
+    
+    def emit(self, record):
+        # handle() 调用 emit 时已持有 self.lock
+        try:
+            line = (self.format(record) + "\n").encode('utf-8')
+            self._chunks.append(line)
+            self._pending += len(line)
+            if self._pending >= self.BUFFER_SIZE:
+                self._write_pending()
+        except Exception:
+            self.handleError(record)
+    
+    def _write_pending(self):
+        """将暂存的日志行合并后写入文件（调用方需持有 self.lock）"""
+        if not self._chunks or self._fd is None:
+            return
+        data = memoryview(b"".join(self._chunks))
+        self._chunks.clear()
+        self._pending = 0
+        while data:
+            written = os.write(self._fd, data)
+            data = data[written:]
+    
+    def flush_buffer(self):
+        """将缓冲区内容写入磁盘"""
+        with self.lock:
+            self._write_pending()
+    
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.FLUSH_INTERVAL):
+            try:
+                self.flush_buffer()
+            except Exception:
+                pass
+    
+    def close(self):
+        self._stop_event.set()
+        with self.lock:
+            try:
+                self._write_pending()
+            finally:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+        super().close()
+
+
 def ensure_log_dir():
     """确保日志目录存在"""
     if not os.path.exists(LOG_DIR):
@@ -25,12 +99,12 @@ def ensure_log_dir():
 
 def init_log_file():
     """初始化日志文件（仅开发模式）"""
-    global _log_file, _log_file_path
+    global _file_logger, _log_listener, _log_file_path
     
     if not DEBUG_MODE:
         return
     
-    if _log_file is not None:
+    if _file_logger is not None:
         return  # 已初始化
     
     try:
@@ -40,56 +114,99 @@ def init_log_file():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         _log_file_path = os.path.join(LOG_DIR, f"FF14_DCT_{timestamp}.log")
         
-        _log_file = open(_log_file_path, 'w', encoding='utf-8')
+        file_handler = _BufferedFileHandler(_log_file_path)
+        # 时间戳由调用方写入消息，格式化器不再重复生成
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        
+        log_queue = queue.SimpleQueue()
+        _log_listener = QueueListener(log_queue, file_handler)
+        _log_listener.start()
+        
+        _file_logger = logging.getLogger("FF14DCT.file")
+        _file_logger.setLevel(logging.INFO)
+        _file_logger.propagate = False
+        _file_logger.addHandler(QueueHandler(log_queue))
+        
         _write_log_raw(f"{APP_NAME} - 日志开始")
         _write_log_raw(f"启动时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         _write_log_raw("=" * 60)
         print(f"[信息] 日志文件: {_log_file_path}")
         
-        # 注册退出时关闭日志文件
+        # 注册退出时写完队列中的日志并关闭文件
         atexit.register(close_log_file)
         
     except Exception as e:
         print(f"[警告] 无法创建日志文件: {e}")
-        _log_file = None
+        _file_logger = None
+
+
+# 最近一次格式化的 (整秒, "HH:MM:SS")，同一秒内的日志行复用
+_last_timestamp = (0, "")
+
 
+def _current_timestamp():
+    """返回当前时间的 "HH:MM:SS"，每秒只格式化一次"""
+    global _last_timestamp
+    sec = int(time.time())
+    cached_sec, cached_ts = _last_timestamp
+    if sec != cached_sec:
+        cached_ts = time.strftime("%H:%M:%S", time.localtime(sec))
+        _last_timestamp = (sec, cached_ts)
+    return cached_ts
 
-def _write_log_raw(message):
-    """写入日志文件（内部使用）"""
-    global _log_file
-    if _log_file:
+
+def _write_log_raw(message, timestamp=None):
+    """
+    写入日志文件（内部使用，非阻塞）
+    timestamp 为已格式化的 "HH:MM:SS"，未提供时取当前时间
+    """
+    if _file_logger:
         try:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            _log_file.write(f"[{timestamp}] {message}\n")
-            _log_file.flush()
+            if timestamp is None:
+                timestamp = _current_timestamp()
+            _file_logger.info(f"[{timestamp}] {message}")
         except:
             pass
 
 
 def close_log_file():
     """关闭日志文件"""
-    global _log_file
-    if _log_file:
+    global _file_logger, _log_listener
+    if _file_logger:
         try:
             _write_log_raw("=" * 60)
             _write_log_raw(f"结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            _log_file.close()
+            # stop() 会先处理完队列中剩余的记录
+            _log_listener.stop()
+            for handler in _log_listener.handlers:
+                handler.close()
         except:
             pass
-        _log_file = None
+        _file_logger = None
+        _log_listener = None
 
 
-def debug_log(message):
-    """输出调试日志"""
-    if DEBUG_MODE:
+if DEBUG_MODE:
+    def debug_log(message):
+        """输出调试日志"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[DEBUG {timestamp}] {message}")
-        # 同时写入日志文件
-        _write_log_raw(f"[DEBUG] {message}")
+        # 同时写入日志文件，复用同一时间戳的时分秒部分
+        _write_log_raw(f"[DEBUG] {message}", timestamp[11:])
+else:
+    def debug_log(message):
+        """输出调试日志（非开发模式下不做任何事）"""
+
+
+# 响应体超过该字节数时调试输出不解析JSON
+_LOG_PARSE_LIMIT = 4096
 
 
 def log_request(method, url, cookies, response):
-    """记录HTTP请求日志"""
+    """
+    记录HTTP请求日志
+    cookies 可直接传入 session.cookies，非开发模式下不做任何转换
+    """
     if not DEBUG_MODE:
         return
     
@@ -97,25 +214,139 @@ def log_request(method, url, cookies, response):
     print(f"[HTTP] {method} {url[:100]}...")
     print(f"[Cookies] {len(cookies)} 个")
     print(f"[Status] {response.status_code}")
-    try:
-        resp_data = response.json()
-        # 简化输出，只显示关键信息
-        if 'return_code' in resp_data:
-            print(f"[Response] return_code={resp_data.get('return_code')}, return_message={resp_data.get('return_message', '')}")
-        else:
-            print(f"[Response] {json.dumps(resp_data, ensure_ascii=False)[:200]}...")
-    except:
-        print(f"[Response] {response.text[:200]}...")
+    content = response.content
+    if len(content) > _LOG_PARSE_LIMIT:
+        # 大响应（如区服列表）只截取开头，不为调试输出解析整个JSON
+        print(f"[Response] ({len(content)} 字节) {content[:200].decode('utf-8', errors='ignore')}...")
+    else:
+        try:
+            resp_data = json_loads(content)
+            # 解析结果挂在响应对象上，接口方法解析时直接复用
+            response._cached_json = resp_data
+            # 简化输出，只显示关键信息
+            if 'return_code' in resp_data:
+                print(f"[Response] return_code={resp_data.get('return_code')}, return_message={resp_data.get('return_message', '')}")
+            else:
+                print(f"[Response] {json_dumps(resp_data).decode('utf-8')[:200]}...")
+        except:
+            print(f"[Response] {response.text[:200]}...")
     print('='*60 + '\n')
 
 
-def log_transfer_history(role_name, source_area, source_server, target_area, target_server, success=True, order_id=None):
+# 传送历史记录之间的分隔线
+_HISTORY_SEPARATOR = "-" * 50
+# 匹配记录首行的时间戳，如 "[2025-01-01 12:00:00] [成功]"
+_HISTORY_TIME_RE = re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]', re.M)
+# 匹配记录中的目标行，如 "  目标: 陆行鸟 - 拉诺西亚"
+_HISTORY_TARGET_RE = re.compile(r'^\s*目标:\s*(.+?)\s+-\s+(.+?)\s*$', re.M)
+_history_order_checked = False
+
+# 传送历史异步写入：调用方只把格式化好的记录放入队列，由后台线程合并写入
+_history_queue = queue.SimpleQueue()
+_history_event = threading.Event()
+_history_write_lock = threading.Lock()
+_history_worker = None
+_history_worker_lock = threading.Lock()
+
+
+def _read_history_tail(size=4096):
+    """读取传送历史文件末尾最多 size 字节（不读取整个文件）"""
+    with open(LOG_TRANSFER_HISTORY_FILE, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - size))
+        data = f.read()
+    # 截断位置可能落在多字节字符中间，忽略不完整的字节
+    return data.decode('utf-8', errors='ignore')
+
+
+def _ensure_history_append_order():
     """
-    记录传送历史到日志文件
-    日志以倒序方式记录（最新的在最前面）
+    旧版本的传送历史按倒序写入（最新的在最前面），现在改为追加写入（最新的在最后）
+    比较首条与末条记录的时间，旧格式文件整体反转一次；每个进程只检查一次
     """
-    ensure_log_dir()
+    global _history_order_checked
+    if _history_order_checked:
+        return
+    _history_order_checked = True
     
+    try:
+        with open(LOG_TRANSFER_HISTORY_FILE, 'r', encoding='utf-8') as f:
+            first = _HISTORY_TIME_RE.match(f.readline())
+        last = _HISTORY_TIME_RE.findall(_read_history_tail())
+        if not first or not last or first.group(1) <= last[-1]:
+            return
+        
+        with open(LOG_TRANSFER_HISTORY_FILE, 'r', encoding='utf-8') as f:
+            content = f.read()
+        records = [r for r in content.split(_HISTORY_SEPARATOR + "\n") if r.strip()]
+        records.reverse()
+        
+        tmp_path = LOG_TRANSFER_HISTORY_FILE + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("".join(f"{r}{_HISTORY_SEPARATOR}\n" for r in records))
+        os.replace(tmp_path, LOG_TRANSFER_HISTORY_FILE)
+        debug_log(f"传送历史已转换为按时间顺序记录: {len(records)} 条")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        debug_log(f"转换传送历史顺序失败: {e}")
+
+
+def _write_pending_history():
+    """
+    将队列中的传送历史一次性追加写入文件（每批只打开一次文件）
+    队列只在持有写锁时取出，保证记录按提交顺序写入；
+    旧格式历史文件的顺序转换也只在持有写锁时进行，避免覆盖刚追加的记录
+    """
+    with _history_write_lock:
+        _ensure_history_append_order()
+        entries = []
+        while True:
+            try:
+                entries.append(_history_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not entries:
+            return
+        
+        try:
+            ensure_log_dir()
+            with open(LOG_TRANSFER_HISTORY_FILE, 'a', encoding='utf-8') as f:
+                f.write("".join(entries))
+            debug_log(f"传送历史已记录到: {LOG_TRANSFER_HISTORY_FILE} ({len(entries)} 条)")
+        except Exception as e:
+            print(f"[警告] 记录传送历史失败: {e}")
+
+
+def _history_worker_loop():
+    while True:
+        _history_event.wait()
+        _history_event.clear()
+        _write_pending_history()
+
+
+def _ensure_history_worker():
+    """首次记录传送历史时启动后台写入线程，并注册退出时写完剩余记录"""
+    global _history_worker
+    if _history_worker is not None:
+        return
+    with _history_worker_lock:
+        if _history_worker is None:
+            atexit.register(flush_transfer_history)
+            _history_worker = threading.Thread(target=_history_worker_loop, daemon=True, name="history-writer")
+            _history_worker.start()
+
+
+def flush_transfer_history():
+    """将尚未写入的传送历史立即写入文件"""
+    _write_pending_history()
+
+
+def log_transfer_history(role_name, source_area, source_server, target_area, target_server, success=True, order_id=None):
+    """
+    记录传送历史到日志文件（非阻塞）
+    日志按时间顺序追加记录（最新的在最后面），由后台线程写入，写入开销与历史长度无关
+    """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     status = "成功" if success else "失败"
     
@@ -128,58 +359,37 @@ def log_transfer_history(role_name, source_area, source_server, target_area, tar
     )
     if order_id:
         log_entry += f"  订单: {order_id}\n"
-    log_entry += "-" * 50 + "\n"
-    
-    # 读取现有日志内容
-    existing_content = ""
-    if os.path.exists(LOG_TRANSFER_HISTORY_FILE):
-        try:
-            with open(LOG_TRANSFER_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                existing_content = f.read()
-        except:
-            existing_content = ""
+    log_entry += _HISTORY_SEPARATOR + "\n"
     
-    # 将新日志条目添加到开头（倒序）
-    new_content = log_entry + existing_content
-    
-    # 写入文件
-    try:
-        with open(LOG_TRANSFER_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        debug_log(f"传送历史已记录到: {LOG_TRANSFER_HISTORY_FILE}")
-    except Exception as e:
-        print(f"[警告] 记录传送历史失败: {e}")
+    # 放入队列，由后台线程追加写入文件
+    _ensure_history_worker()
+    _history_queue.put(log_entry)
+    _history_event.set()
 
 
 def get_last_transfer_from_history():
-    """从日志文件获取最近一次传送记录"""
+    """从日志文件获取最近一次传送记录（只读取文件末尾）"""
+    # 先写入队列中尚未落盘的记录（同时在写锁内完成旧格式转换），保证读到最新一次传送
+    flush_transfer_history()
+    
     if not os.path.exists(LOG_TRANSFER_HISTORY_FILE):
         return None
     
     try:
-        with open(LOG_TRANSFER_HISTORY_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = _read_history_tail(8192)
         
-        if not content.strip():
+        # 按分隔线切分记录，最后一条即最近一次传送
+        records = [r for r in content.split(_HISTORY_SEPARATOR) if r.strip()]
+        if not records:
             return None
         
-        # 解析第一条记录
-        lines = content.strip().split('\n')
-        if len(lines) < 4:
+        match = _HISTORY_TARGET_RE.search(records[-1])
+        if not match:
             return None
-        
-        # 查找目标行
-        for line in lines:
-            if line.strip().startswith("目标:"):
-                target_info = line.replace("目标:", "").strip()
-                parts = target_info.split(" - ")
-                if len(parts) == 2:
-                    return {
-                        'area': parts[0].strip(),
-                        'server': parts[1].strip()
-                    }
-        
-        return None
+        return {
+            'area': match.group(1),
+            'server': match.group(2)
+        }
         
     except Exception as e:
         debug_log(f"读取传送历史失败: {e}")
@@ -6,14 +6,18 @@ FF14DCT 超域返回模块
 
 超域返回流程：
 1. 调用 pageInit(migrationType=0) 初始化页面
-2. 调用 queryMigrationOrders 获取旅行中的订单
-3. 调用 queryGroupListCrossSource 获取可返回的服务器列表
+2. 并行调用 queryMigrationOrders 获取旅行中的订单、
+   queryGroupListCrossSource 获取可返回的服务器列表
+3. 用户选择要返回的订单
 4. 用户选择当前所在的服务器
 5. 调用 travelBack 提交返回请求
 """
 
+import re
 import time
 import random
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from .config import ConfigManager, DEBUG_MODE
 from .api import FF14APIClient
 from .backend import telemetry
@@ -21,10 +25,51 @@ from .logger import log_transfer_history, debug_log
 from .ui import (
     show_area_selection, show_server_selection, show_role_selection,
     show_transfer_summary, confirm_action, show_success_message,
-    show_error_message, show_info_message, print_after_action_ads
+    show_error_message, show_info_message, print_after_action_ads,
+    countdown
 )
 
 
+# 订单状态描述中的关键字及其对应的状态标记
+STATUS_ACTIVE = 'active'            # 旅行中
+STATUS_RETURN_OK = 'return_ok'      # 返回成功
+STATUS_FAILED = 'failed'            # 失败
+STATUS_TRAVEL_DONE = 'travel_done'  # 旅行结束
+_STATUS_KEYWORDS = {
+    '旅行中': STATUS_ACTIVE,
+    '返回成功': STATUS_RETURN_OK,
+    '失败': STATUS_FAILED,
+    '旅行结束': STATUS_TRAVEL_DONE,
+}
+_STATUS_RE = re.compile('|'.join(_STATUS_KEYWORDS))
+
+
+@lru_cache(maxsize=64)
+def classify_status(status_desc):
+    """
+    将订单状态描述（migrationStatusDesc）归类为状态标记集合
+    状态描述的取值很少，结果按原字符串缓存，重复订单只需一次字典查找
+    """
+    return frozenset(_STATUS_KEYWORDS[m] for m in _STATUS_RE.findall(status_desc or ''))
+
+
+def index_return_areas(return_areas):
+    """
+    为超域返回区服列表构建一次性索引
+    返回: (area_by_id, area_by_name, server_by_id)
+        area_by_id: {areaId: area}
+        area_by_name: {areaName: area}
+        server_by_id: {(areaId, groupId): (area, server)}
+    """
+    area_by_id = {a.get('areaId'): a for a in return_areas}
+    area_by_name = {a.get('areaName'): a for a in return_areas}
+    server_by_id = {
+        (a.get('areaId'), g.get('groupId')): (a, g)
+        for a in return_areas for g in a.get('groups', ())
+    }
+    return area_by_id, area_by_name, server_by_id
+
+
 class ReturnService:
     """超域返回服务"""
     
@@ -50,9 +95,13 @@ class ReturnService:
         print("\n[步骤1] 初始化页面...")
         self.api.page_init(migration_type=0)
         
-        # 2. 获取订单列表，查找旅行中的订单
-        print("\n[步骤2] 获取旅行订单列表...")
-        orders_data = self.api.fetch_migration_orders()
+        # 2. 获取订单列表与可返回的服务器列表（两者互不依赖，并行请求）
+        print("\n[步骤2] 获取旅行订单列表及可返回的服务器列表...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            orders_future = executor.submit(self.api.fetch_migration_orders)
+            areas_future = executor.submit(self.api.fetch_return_area_list)
+            orders_data = orders_future.result()
+            return_areas = areas_future.result()
         
         if not orders_data:
             show_error_message("未能获取订单列表，请确保已正确登录")
@@ -88,20 +137,15 @@ class ReturnService:
         
         debug_log(f"选择的订单: {selected_order}")
         
-        # 4. 获取可返回的服务器列表
-        print("\n[步骤4] 获取可返回的服务器列表...")
-        return_areas = self.api.fetch_return_area_list()
-        
+        # 4. 检查可返回的服务器列表
+        print("\n[步骤4] 匹配可返回的服务器列表...")
         if not return_areas:
             show_error_message("未能获取可返回的服务器列表")
             return False
         
-        # 5. 从服务器列表中找到订单显示的目的地大区
-        current_area = None
-        for area in return_areas:
-            if area.get('areaId') == current_area_id or area.get('areaName') == current_area_name:
-                current_area = area
-                break
+        # 5. 从服务器列表中找到订单显示的目的地大区（优先按ID匹配，其次按名称）
+        area_by_id, area_by_name, _ = index_return_areas(return_areas)
+        current_area = area_by_id.get(current_area_id) or area_by_name.get(current_area_name)
         
         if not current_area:
             print(f"\n[警告] 未在服务器列表中找到大区: {current_area_name}")
@@ -167,36 +211,27 @@ class ReturnService:
         - migrationStatus=5 + travelStatus=1: 旅行中【已达到目的地】
         - migrationStatusDesc="旅行中【已达到目的地】"
         """
-        active_orders = []
-        
+        # 筛选条件：
+        # 1. migrationType=4 (超域旅行出发服务)，整数比较开销最小，放在最前面
+        # 2. migrationStatus=5 且 travelStatus=1 (旅行中/已达到目的地)
+        # 或者直接判断 statusDesc 包含 "旅行中"
         # 使用正确的字段名 orderlist
-        order_list = orders_data.get('orderlist', [])
+        active_orders = [
+            order for order in orders_data.get('orderlist', ())
+            if order.get('migrationType') == 4 and (
+                (order.get('migrationStatus') == 5 and order.get('travelStatus') == 1)
+                or STATUS_ACTIVE in classify_status(order.get('migrationStatusDesc', ''))
+            )
+        ]
         
-        for order in order_list:
-            order_id = order.get('orderId', 'N/A')
-            migration_type = order.get('migrationType', -1)
-            migration_status = order.get('migrationStatus', -1)
-            travel_status = order.get('travelStatus', -1)
-            status_desc = order.get('migrationStatusDesc', '')
-            
-            debug_log(f"订单 {order_id}: migrationType={migration_type}, "
-                     f"migrationStatus={migration_status}, travelStatus={travel_status}, "
-                     f"statusDesc={status_desc}")
-            
-            # 筛选条件：
-            # 1. migrationType=4 (超域旅行出发服务)
-            # 2. migrationStatus=5 且 travelStatus=1 (旅行中/已达到目的地)
-            # 或者直接判断 statusDesc 包含 "旅行中"
-            is_travel_order = (migration_type == 4)  # 出发服务
-            is_active = (migration_status == 5 and travel_status == 1) or ('旅行中' in status_desc)
-            
-            if is_travel_order and is_active:
-                # 从 migrationDetailList 提取角色名
-                detail_list = order.get('migrationDetailList', [])
-                if detail_list:
-                    order['roleName'] = detail_list[0].get('roleName', '未知角色')
-                active_orders.append(order)
-                debug_log(f"  -> 符合条件，加入活跃订单列表")
+        for order in active_orders:
+            # 从 migrationDetailList 提取角色名
+            detail_list = order.get('migrationDetailList', [])
+            if detail_list:
+                order['roleName'] = detail_list[0].get('roleName', '未知角色')
+            debug_log(f"活跃订单 {order.get('orderId', 'N/A')}: "
+                     f"migrationStatus={order.get('migrationStatus')}, travelStatus={order.get('travelStatus')}, "
+                     f"statusDesc={order.get('migrationStatusDesc', '')}")
         
         return active_orders
     
@@ -336,10 +371,7 @@ class ReturnService:
             print("[提示] 按 Ctrl+C 可以中断程序")
             
             try:
-                for remaining in range(wait_sec, 0, -1):
-                    print(f"\r[倒计时] {remaining} 秒...", end='', flush=True)
-                    time.sleep(1)
-                print()
+                countdown(wait_sec)
             except KeyboardInterrupt:
                 print()
                 print("\n[中断] 用户取消操作")
@@ -354,68 +386,80 @@ class ReturnService:
                 
                 return None
     
-    def _poll_return_status(self, travel_order_id, return_order_id, max_attempts=12, interval=5):
+    def _poll_return_status(self, travel_order_id, return_order_id, initial=2, cap=10, factor=1.5, budget=90):
         """
         轮询订单状态，检查返回是否成功
+        轮询间隔从 initial 秒开始按 factor 递增，最长 cap 秒，并带少量随机抖动
         
         :param travel_order_id: 原旅行订单号
         :param return_order_id: 返回订单号
-        :param max_attempts: 最大轮询次数（默认12次，共60秒）
-        :param interval: 轮询间隔秒数
+        :param initial: 首次轮询间隔秒数
+        :param cap: 最大轮询间隔秒数
+        :param factor: 间隔增长倍数
+        :param budget: 总等待时间上限（秒），按实际经过时间计算（包含请求耗时）
         :return: True=返回成功, False=未成功或超时
         """
-        for attempt in range(1, max_attempts + 1):
-            print(f"[轮询] 第 {attempt}/{max_attempts} 次查询订单状态...")
+        start = time.monotonic()
+        deadline = start + budget
+        delay = initial
+        attempt = 0
+        while True:
+            attempt += 1
+            print(f"[轮询] 第 {attempt} 次查询订单状态（已等待 {int(time.monotonic() - start)}/{budget} 秒）...")
             
             try:
                 orders_data = self.api.fetch_migration_orders()
                 
                 if not orders_data:
                     debug_log("轮询时获取订单列表失败")
-                    time.sleep(interval)
-                    continue
-                
-                order_list = orders_data.get('orderlist', [])
+                    order_list = ()
+                else:
+                    order_list = orders_data.get('orderlist', [])
                 
-                # 查找返回订单的状态
+                # 单次遍历：同时查找返回订单状态和原旅行订单状态
+                # 返回订单的结论优先，原旅行订单的"旅行结束"在遍历完整个列表后才采用
+                travel_done_desc = None
                 for order in order_list:
-                    order_id = order.get('orderId', '')
-                    migration_type = order.get('migrationType', -1)
-                    status_desc = order.get('migrationStatusDesc', '')
+                    _get = order.get
+                    order_id = _get('orderId', '')
+                    migration_type = _get('migrationType', -1)
                     
                     # 检查是否是返回订单 (migrationType=5)
                     # 并且订单号匹配（返回订单号或原旅行订单号）
                     if migration_type == 5:
                         if order_id == return_order_id or order_id == travel_order_id:
+                            status_desc = _get('migrationStatusDesc', '')
+                            states = classify_status(status_desc)
                             debug_log(f"找到返回订单: {order_id}, 状态: {status_desc}")
                             
-                            if '返回成功' in status_desc:
+                            if STATUS_RETURN_OK in states:
                                 print(f"[状态] 订单状态: {status_desc}")
                                 return True
-                            elif '失败' in status_desc:
+                            elif STATUS_FAILED in states:
                                 print(f"[状态] 订单状态: {status_desc}")
                                 return False
                             else:
                                 print(f"[状态] 订单状态: {status_desc}，继续等待...")
-                
-                # 也检查原旅行订单是否变为"旅行结束"
-                for order in order_list:
-                    order_id = order.get('orderId', '')
-                    migration_type = order.get('migrationType', -1)
-                    status_desc = order.get('migrationStatusDesc', '')
-                    travel_status = order.get('travelStatus', -1)
                     
-                    if order_id == travel_order_id and migration_type == 4:
-                        if '旅行结束' in status_desc or travel_status == 3:
-                            print(f"[状态] 原旅行订单状态: {status_desc}")
-                            # 原订单变为旅行结束，说明返回成功
-                            return True
+                    # 也检查原旅行订单是否变为"旅行结束"
+                    elif migration_type == 4 and order_id == travel_order_id:
+                        status_desc = _get('migrationStatusDesc', '')
+                        if STATUS_TRAVEL_DONE in classify_status(status_desc) or _get('travelStatus', -1) == 3:
+                            travel_done_desc = status_desc
+                
+                if travel_done_desc is not None:
+                    print(f"[状态] 原旅行订单状态: {travel_done_desc}")
+                    # 原订单变为旅行结束，说明返回成功
+                    return True
                 
             except Exception as e:
                 debug_log(f"轮询订单状态异常: {e}")
             
-            if attempt < max_attempts:
-                time.sleep(interval)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(delay + random.uniform(0, 0.5), remaining))
+            delay = min(cap, delay * factor)
         
         print("[超时] 订单状态轮询超时")
         return False
@@ -4,13 +4,15 @@
 
 from __future__ import annotations
 
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
 from ..api import FF14APIClient
-from ..browser import BrowserManager
 from ..config import ConfigManager
 from ..credential import credential_manager
 
+if TYPE_CHECKING:
+    from ..browser import BrowserManager
+
 
 class LoginService:
     """封装缓存登录和浏览器登录流程。"""
@@ -41,6 +43,9 @@ class LoginService:
 
     def open_login_page(self, browser_choice: str) -> BrowserManager:
         """初始化指定浏览器并打开登录页。"""
+        # 仅在需要浏览器登录时才加载 selenium
+        from ..browser import BrowserManager
+
         self.browser_mgr = BrowserManager(self.config)
         if not self.browser_mgr.init_browser_with_choice(browser_choice):
             raise RuntimeError("浏览器初始化失败")
@@ -10,6 +10,10 @@ from typing import Callable, Optional
 
 from ..backend import telemetry
 from ..logger import log_transfer_history
+from ..return_home import (
+    index_return_areas, classify_status,
+    STATUS_ACTIVE, STATUS_RETURN_OK, STATUS_FAILED, STATUS_TRAVEL_DONE,
+)
 
 
 class ReturnOrchestrator:
@@ -21,12 +25,19 @@ class ReturnOrchestrator:
 
     def fetch_active_orders(self):
         """拉取并筛选可返回订单。"""
+        return list(self.iter_active_orders())
+
+    def has_active_order(self, role_name: str) -> bool:
+        """检查指定角色是否有可返回订单，找到第一条即停止筛选。"""
+        return any(order.get("roleName") == role_name for order in self.iter_active_orders())
+
+    def iter_active_orders(self):
+        """拉取订单列表并逐条产出可返回订单，调用方可随时提前结束。"""
         self.api.page_init(migration_type=0)
         orders_data = self.api.fetch_migration_orders()
         if not orders_data:
-            return []
+            return
 
-        active_orders = []
         for order in orders_data.get("orderlist", []):
             migration_type = order.get("migrationType", -1)
             migration_status = order.get("migrationStatus", -1)
@@ -34,13 +45,12 @@ class ReturnOrchestrator:
             status_desc = order.get("migrationStatusDesc", "")
 
             is_travel_order = migration_type == 4
-            is_active = (migration_status == 5 and travel_status == 1) or ("旅行中" in status_desc)
+            is_active = (migration_status == 5 and travel_status == 1) or (STATUS_ACTIVE in classify_status(status_desc))
             if is_travel_order and is_active:
                 detail_list = order.get("migrationDetailList", [])
                 if detail_list and not order.get("roleName"):
                     order["roleName"] = detail_list[0].get("roleName", "未知角色")
-                active_orders.append(order)
-        return active_orders
+                yield order
 
     def resolve_current_server_options(self, order: dict):
         """根据订单解析当前所在大区与可选服务器。"""
@@ -53,11 +63,8 @@ class ReturnOrchestrator:
         if not return_areas:
             raise RuntimeError("未能获取可返回服务器列表")
 
-        current_area = None
-        for area in return_areas:
-            if area.get("areaId") == current_area_id or area.get("areaName") == current_area_name:
-                current_area = area
-                break
+        area_by_id, area_by_name, server_by_id = index_return_areas(return_areas)
+        current_area = area_by_id.get(current_area_id) or area_by_name.get(current_area_name)
         if not current_area:
             raise RuntimeError("无法匹配订单中的目的地大区")
 
@@ -65,7 +72,7 @@ class ReturnOrchestrator:
         if not servers:
             raise RuntimeError("当前大区没有可选服务器")
 
-        default_server = next((s for s in servers if s.get("groupId") == current_server_id), None)
+        _, default_server = server_by_id.get((current_area.get("areaId"), current_server_id), (None, None))
         if not default_server:
             default_server = next((s for s in servers if s.get("groupName") == current_server_name), None)
         if not default_server:
@@ -124,54 +131,63 @@ class ReturnOrchestrator:
             else:
                 log("返回提交失败，将重试。")
 
-            wait_sec = random.randint(61, 65)
-            for remaining in range(wait_sec, 0, -1):
+            # 每5秒刷新一次倒计时，避免等待期间每秒唤醒并输出日志
+            remaining = random.randint(61, 65)
+            while remaining > 0:
                 log(f"重试倒计时：{remaining} 秒")
-                sleep_cb(1)
+                chunk = min(5, remaining)
+                sleep_cb(chunk)
+                remaining -= chunk
 
     def _poll_return_status(
         self,
         travel_order_id: str,
         return_order_id: str,
         log_cb: Callable[[str], None],
-        max_attempts: int = 12,
-        interval: int = 5,
+        initial: float = 2,
+        cap: float = 10,
+        factor: float = 1.5,
+        budget: float = 90,
         sleep_cb: Callable[[float], None] = time.sleep,
     ) -> bool:
-        """轮询订单状态，确认返回成功。"""
-        for attempt in range(1, max_attempts + 1):
-            log_cb(f"返回状态轮询 {attempt}/{max_attempts}…")
+        """轮询订单状态，确认返回成功（间隔逐步递增，包含请求耗时在内总计不超过 budget 秒）。"""
+        start = time.monotonic()
+        deadline = start + budget
+        delay = initial
+        attempt = 0
+        while True:
+            attempt += 1
+            log_cb(f"返回状态轮询 {attempt}（已等待 {int(time.monotonic() - start)}/{int(budget)} 秒）…")
             try:
                 orders_data = self.api.fetch_migration_orders()
                 if not orders_data:
                     log_cb("轮询时获取订单列表失败，继续重试。")
-                    if attempt < max_attempts:
-                        sleep_cb(interval)
-                    continue
-
-                order_list = orders_data.get("orderlist", [])
+                    order_list = ()
+                else:
+                    order_list = orders_data.get("orderlist", [])
 
+                # 返回订单的结论优先，原旅行订单的"旅行结束"在遍历完整个列表后才采用
+                travel_done = False
                 for order in order_list:
-                    order_id = order.get("orderId", "")
-                    migration_type = order.get("migrationType", -1)
-                    status_desc = order.get("migrationStatusDesc", "")
+                    _get = order.get
+                    order_id = _get("orderId", "")
+                    migration_type = _get("migrationType", -1)
                     if migration_type == 5 and (order_id == return_order_id or order_id == travel_order_id):
-                        if "返回成功" in status_desc:
+                        states = classify_status(_get("migrationStatusDesc", ""))
+                        if STATUS_RETURN_OK in states:
                             return True
-                        if "失败" in status_desc:
+                        if STATUS_FAILED in states:
                             return False
-
-                for order in order_list:
-                    order_id = order.get("orderId", "")
-                    migration_type = order.get("migrationType", -1)
-                    status_desc = order.get("migrationStatusDesc", "")
-                    travel_status = order.get("travelStatus", -1)
-                    if order_id == travel_order_id and migration_type == 4:
-                        if "旅行结束" in status_desc or travel_status == 3:
-                            return True
+                    elif migration_type == 4 and order_id == travel_order_id:
+                        if STATUS_TRAVEL_DONE in classify_status(_get("migrationStatusDesc", "")) or _get("travelStatus", -1) == 3:
+                            travel_done = True
+                if travel_done:
+                    return True
             except Exception as e:
                 log_cb(f"轮询订单状态异常: {e}")
 
-            if attempt < max_attempts:
-                sleep_cb(interval)
-        return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            sleep_cb(min(delay + random.uniform(0, 0.5), remaining))
+            delay = min(cap, delay * factor)
@@ -4,9 +4,9 @@
 
 from __future__ import annotations
 
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
-from ..backend import ads_client, telemetry, version_client
+from ..backend import ads_client, fetch_startup_info as fetch_backend_startup_info, telemetry, version_client
 
 
 class RuntimeService:
@@ -19,9 +19,18 @@ class RuntimeService:
         """记录应用启动遥测。"""
         telemetry.record_app_start()
 
-    def check_version(self) -> Dict[str, object]:
-        """检查版本并返回统一结果。"""
-        info = version_client.check_version()
+    def check_version(self, force: bool = False) -> Dict[str, object]:
+        """检查版本并返回统一结果；force=True 时忽略本地缓存。"""
+        return self._build_version_result(version_client.check_version(force=force))
+
+    def fetch_startup_info(self) -> Tuple[Dict[str, object], List[dict]]:
+        """并行获取启动所需的版本检查结果与操作后公告。"""
+        info, ads = fetch_backend_startup_info()
+        return self._build_version_result(info), ads
+
+    @staticmethod
+    def _build_version_result(info) -> Dict[str, object]:
+        """将版本信息转换为统一结果。"""
         if not info:
             return {
                 "can_continue": True,
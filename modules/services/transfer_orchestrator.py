@@ -35,13 +35,12 @@ class TransferOrchestrator:
         if not areas:
             raise RuntimeError("未能获取大区列表")
 
-        source_area = next((a for a in areas if a.get("areaName") == source_area_name), None)
+        source_area = self.api.find_area_by_name(source_area_name)
         if not source_area:
             raise RuntimeError("源大区无效")
 
-        target_areas = [a for a in areas if a.get("areaId") != source_area.get("areaId")]
-        target_area = next((a for a in target_areas if a.get("areaName") == target_area_name), None)
-        if not target_area:
+        target_area = self.api.find_area_by_name(target_area_name)
+        if not target_area or target_area.get("areaId") == source_area.get("areaId"):
             raise RuntimeError("目标大区无效或与源大区相同")
 
         source_server = self._find_server(source_area, source_server_name)
@@ -50,11 +49,11 @@ class TransferOrchestrator:
             raise RuntimeError("源/目标服务器选择无效")
 
         roles = self.api.fetch_role_list(source_area.get("areaId"), source_server.get("groupId"))
-        role = next((r for r in roles if r.get("roleName", r.get("name")) == role_name), None)
+        role = next((r for r in roles if r["_display_name"] == role_name), None)
         if not role:
             raise RuntimeError("角色选择无效")
 
-        final_role_name = role.get("roleName", role.get("name", "未知"))
+        final_role_name = role["_display_name"]
         log(f"提交跨区传送：{final_role_name} | {source_area_name}-{source_server_name} -> {target_area_name}-{target_server_name}")
 
         self.api.page_init(migration_type=4)
@@ -68,27 +67,30 @@ class TransferOrchestrator:
             if isinstance(result, str) and result.startswith("GM"):
                 order_id = result
                 log(f"订单已提交：{order_id}，开始轮询状态…")
-                for idx in range(10):
-                    status = self.api.check_order_status(order_id)
-                    log(f"状态轮询 {idx + 1}/10：{status}")
-                    if status == 5:
-                        self._on_transfer_success(
-                            final_role_name,
-                            source_area_name,
-                            source_server_name,
-                            target_area_name,
-                            target_server_name,
-                            order_id,
-                        )
-                        return {
-                            "success": True,
-                            "order_id": order_id,
-                            "message": "跨区传送成功",
-                        }
-                    if status == -1:
-                        log("预检失败，准备重试。")
-                        break
-                    sleep_cb(5)
+                status = self.api.poll_order_status(
+                    order_id,
+                    max_wait=45,
+                    sleep_cb=sleep_cb,
+                    status_cb=lambda s: log(f"状态轮询：{s}"),
+                )
+                if status == 5:
+                    self._on_transfer_success(
+                        final_role_name,
+                        source_area_name,
+                        source_server_name,
+                        target_area_name,
+                        target_server_name,
+                        order_id,
+                    )
+                    return {
+                        "success": True,
+                        "order_id": order_id,
+                        "message": "跨区传送成功",
+                    }
+                if status == -1:
+                    log("预检失败，准备重试。")
+                else:
+                    log("订单状态确认超时，准备重试。")
 
             elif isinstance(result, dict):
                 result_code = result.get("resultCode", -1)
@@ -111,10 +113,13 @@ class TransferOrchestrator:
             else:
                 log("提交失败，准备重试。")
 
-            wait_sec = random.randint(61, 65)
-            for remaining in range(wait_sec, 0, -1):
+            # 每5秒刷新一次倒计时，避免等待期间每秒唤醒并输出日志
+            remaining = random.randint(61, 65)
+            while remaining > 0:
                 log(f"重试倒计时：{remaining} 秒")
-                sleep_cb(1)
+                chunk = min(5, remaining)
+                sleep_cb(chunk)
+                remaining -= chunk
 
     def _find_server(self, area: dict, server_name: str):
         servers = area.get("groups", [])
@@ -5,22 +5,35 @@ FF14DCT 跨区传送模块
 负责超域传送的主要业务逻辑
 """
 
-import time
 import random
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from .config import ConfigManager, DEBUG_MODE
 from .api import FF14APIClient
 from .backend import telemetry
-from .logger import log_transfer_history, debug_log
+from .logger import log_transfer_history
 from .ui import (
     show_area_selection, show_server_selection, show_role_selection,
     show_transfer_summary, confirm_action, show_success_message,
-    show_error_message, show_info_message, print_after_action_ads
+    show_error_message, show_info_message, print_after_action_ads,
+    countdown
 )
 
 
+# 无法通过重试解决的提交结果码（resultCode）：未登录/无权限/角色或服务器不存在
+# 服务端未公开完整的结果码列表，不在此集合中的结果码（包括未知结果码）都按可恢复处理继续重试
+TERMINAL_CODES = frozenset({401, 403, 404})
+
+
 class TransferService:
     """跨区传送服务"""
     
+    # 重试间隔：指数退避 + 随机抖动
+    # 服务端限制每分钟最多提交一次，间隔不低于 MIN_DELAY 秒
+    MIN_DELAY = 61.0
+    MAX_DELAY = 120.0
+    JITTER = 0.1
+    MAX_ATTEMPTS = 10
+    
     def __init__(self, api_client, config_manager):
         """
         初始化传送服务
@@ -53,20 +66,36 @@ class TransferService:
             show_error_message(f"未能获取 {source_area['areaName']} 的服务器列表")
             return False
         
-        source_server = show_server_selection(
-            source_servers, 
-            source_area['areaName'],
-            f"请选择当前角色所在的服务器（{source_area['areaName']}）："
-        )
-        if not source_server:
-            return None
-        
-        # 4. 获取角色列表
-        print("\n[信息] 正在获取角色列表...")
-        roles = self.api.fetch_role_list(
-            source_area['areaId'], 
-            source_server['groupId']
-        )
+        # 用户选择服务器期间，预先获取最可能被选中的服务器的角色列表
+        executor, prefetched = self._prefetch_role_lists(source_area, source_servers)
+        try:
+            source_server = show_server_selection(
+                source_servers, 
+                source_area['areaName'],
+                f"请选择当前角色所在的服务器（{source_area['areaName']}）："
+            )
+            if not source_server:
+                return None
+            
+            # 4. 获取角色列表
+            print("\n[信息] 正在获取角色列表...")
+            future = prefetched.get(source_server['groupId'])
+            roles = None
+            if future:
+                try:
+                    roles = future.result(timeout=self.api.ROLE_LIST_TIMEOUT)
+                except FutureTimeoutError:
+                    print("[信息] 预取角色列表超时，重新获取...")
+                except Exception as e:
+                    # 预取在后台静默进行，错误在前台统一提示后重新获取
+                    print(f"[信息] 预取角色列表失败（{e}），重新获取...")
+            if roles is None:
+                roles = self.api.fetch_role_list(
+                    source_area['areaId'], 
+                    source_server['groupId']
+                )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         if not roles:
             show_error_message(f"在 {source_server['groupName']} 没有找到角色")
@@ -77,7 +106,7 @@ class TransferService:
         if not role:
             return None
         
-        role_name = role.get('roleName', role.get('name', '未知'))
+        role_name = role['_display_name']
         
         # 6. 选择目标大区
         print("\n=== 第2步: 选择目标大区 ===")
@@ -88,7 +117,7 @@ class TransferService:
             show_info_message(f"上次传送目标: {last_transfer.get('area', '')} - {last_transfer.get('server', '')}")
         
         # 过滤掉源大区（不能传送到同一大区）
-        target_areas = [a for a in areas if a['areaId'] != source_area['areaId']]
+        target_areas = self.api.get_target_areas(source_area)
         
         target_area = show_area_selection(target_areas, "请选择要前往的大区：")
         if not target_area:
@@ -134,15 +163,53 @@ class TransferService:
         
         return success
     
+    @staticmethod
+    def _success_banner(target_server):
+        """传送成功提示（整体拼接后一次输出）"""
+        line = "*" * 50
+        return f"\n{line}\n*       跨区传送成功！已传送至 {target_server['groupName']} \n{line}\n"
+    
+    def _prefetch_role_lists(self, source_area, source_servers):
+        """
+        后台预取角色列表
+        候选为上次传送的目标服务器（角色当前最可能所在）和上次的源服务器，仅限当前源大区
+        返回: (线程池, {groupId: Future})
+        """
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="role-prefetch")
+        prefetched = {}
+        last_transfer = self.config.get_last_transfer() or {}
+        candidates = []
+        if last_transfer.get('target_area', last_transfer.get('area')) == source_area['areaName']:
+            candidates.append(last_transfer.get('target_server', last_transfer.get('server')))
+        if last_transfer.get('source_area') == source_area['areaName']:
+            candidates.append(last_transfer.get('source_server'))
+        for server in source_servers:
+            if server['groupName'] in candidates and server['groupId'] not in prefetched:
+                prefetched[server['groupId']] = executor.submit(
+                    self.api.prefetch_role_list, source_area['areaId'], server['groupId']
+                )
+        return executor, prefetched
+    
+    def _retry_delay(self, attempt):
+        """
+        计算第 attempt 次失败后的等待秒数
+        从 MIN_DELAY 开始每次翻倍，最长 MAX_DELAY，上下浮动 JITTER 比例
+        """
+        delay = min(self.MAX_DELAY, self.MIN_DELAY * (2 ** min(attempt - 1, 6)))
+        delay *= 1 + random.uniform(-self.JITTER, self.JITTER)
+        return int(max(self.MIN_DELAY, delay))
+    
     def _run_transfer_loop(self, source_area, source_server, target_area, target_server, role, role_name):
         """
         执行跨区传送循环，支持自动重试
-        每次间隔随机61~65秒
+        重试间隔按指数退避递增（61秒起，最长约2分钟）
+        最多尝试次数默认为 MAX_ATTEMPTS，可在配置文件中通过 max_transfer_attempts 修改（0表示不限）
         """
+        max_attempts = self.config.get_max_transfer_attempts(self.MAX_ATTEMPTS)
         attempt = 0
         order_id = None
         
-        while True:
+        while not max_attempts or attempt < max_attempts:
             attempt += 1
             print()
             print(f"{'='*50}")
@@ -163,58 +230,47 @@ class TransferService:
                 print()
                 print("[信息] 正在检查订单状态...")
                 
-                for check_attempt in range(10):
-                    print(f"[检查] 第 {check_attempt + 1}/10 次状态查询...")
-                    status = self.api.check_order_status(order_id)
+                status = self.api.poll_order_status(order_id, max_wait=45)
+                
+                if status == 5:  # 传送成功
+                    print(self._success_banner(target_server))
+                    
+                    # 记录历史
+                    log_transfer_history(
+                        role_name,
+                        source_area['areaName'], source_server['groupName'],
+                        target_area['areaName'], target_server['groupName'],
+                        success=True,
+                        order_id=order_id
+                    )
+                    
+                    # 保存上次传送目标
+                    self.config.set_last_transfer(
+                        target_area['areaName'],
+                        target_server['groupName'],
+                        role_name=role_name,
+                        source_area_name=source_area['areaName'],
+                        source_server_name=source_server['groupName'],
+                    )
                     
-                    if status == 5:  # 传送成功
-                        print()
-                        print("*" * 50)
-                        print(f"*       跨区传送成功！已传送至 {target_server['groupName']} ")
-                        print("*" * 50)
-                        print()
-                        
-                        # 记录历史
-                        log_transfer_history(
-                            role_name,
-                            source_area['areaName'], source_server['groupName'],
-                            target_area['areaName'], target_server['groupName'],
-                            success=True,
-                            order_id=order_id
-                        )
-                        
-                        # 保存上次传送目标
-                        self.config.set_last_transfer(
-                            target_area['areaName'],
-                            target_server['groupName'],
-                            role_name=role_name,
-                            source_area_name=source_area['areaName'],
-                            source_server_name=source_server['groupName'],
-                        )
-                        
-                        # 记录遥测统计
-                        telemetry.record_transfer()
-                        
-                        # 显示操作后赞助信息
-                        print_after_action_ads()
-                        
-                        return True
-                    elif status == -1:  # 预检失败
-                        print("[信息] 预检失败，将在61~65秒后重试...")
-                        break
+                    # 记录遥测统计
+                    telemetry.record_transfer()
                     
-                    time.sleep(5)  # 每5秒检查一次状态
+                    # 显示操作后赞助信息
+                    print_after_action_ads()
+                    
+                    return True
+                elif status == -1:  # 预检失败
+                    print("[信息] 预检失败，稍后重试...")
+                else:
+                    print("[信息] 订单状态确认超时，稍后重试...")
                     
             elif isinstance(result, dict):
                 # 返回了数据但没有订单号
                 result_code = result.get('resultCode', -1)
                 result_msg = result.get('resultMsg', '未知')
                 if result_code == 0 or result_code == 5:  # 成功状态
-                    print()
-                    print("*" * 50)
-                    print(f"*       跨区传送成功！已传送至 {target_server['groupName']} ")
-                    print("*" * 50)
-                    print()
+                    print(self._success_banner(target_server))
                     
                     # 记录历史
                     log_transfer_history(
@@ -240,22 +296,31 @@ class TransferService:
                     print_after_action_ads()
                     
                     return True
+                elif result_code in TERMINAL_CODES:
+                    show_error_message(f"传送失败: {result_msg} (code: {result_code})，该错误无法通过重试解决")
+                    log_transfer_history(
+                        role_name,
+                        source_area['areaName'], source_server['groupName'],
+                        target_area['areaName'], target_server['groupName'],
+                        success=False
+                    )
+                    return False
                 else:
                     print(f"[信息] 传送结果: {result_msg}，将继续重试...")
             else:
-                print("[信息] 提交失败，将在61~65秒后重试...")
+                print("[信息] 提交失败，稍后重试...")
+            
+            if max_attempts and attempt >= max_attempts:
+                break
             
-            # 等待随机间隔后重试
-            wait_sec = random.randint(61, 65)
+            # 按退避间隔等待后重试
+            wait_sec = self._retry_delay(attempt)
             print()
-            debug_log(f"[DEBUG] 等待 {wait_sec} 秒后进行下一次尝试...")
+            print(f"[信息] 将在 {wait_sec} 秒后进行第 {attempt + 1} 次尝试")
             print("[提示] 按 Ctrl+C 可以中断程序")
             
             try:
-                for remaining in range(wait_sec, 0, -1):
-                    print(f"\r[倒计时] {remaining} 秒...", end='', flush=True)
-                    time.sleep(1)
-                print()
+                countdown(wait_sec)
             except KeyboardInterrupt:
                 print()
                 print("[中断] 用户取消操作")
@@ -267,3 +332,13 @@ class TransferService:
                     success=False
                 )
                 return None
+        
+        # 达到最大尝试次数仍未成功
+        show_error_message(f"已重试 {attempt} 次仍未成功，停止重试")
+        log_transfer_history(
+            role_name,
+            source_area['areaName'], source_server['groupName'],
+            target_area['areaName'], target_server['groupName'],
+            success=False
+        )
+        return False
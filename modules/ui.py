@@ -5,6 +5,8 @@ FF14DCT UI模块
 负责用户界面交互和显示
 """
 
+import time
+
 from .config import VERSION, ConfigManager, DEBUG_MODE
 from .backend import ads_client
 from .logger import get_last_transfer_from_history
@@ -20,30 +22,55 @@ def print_header():
     print("="*60)
 
 
+def _print_menu(prompt, names):
+    """
+    打印带编号的选项菜单
+    整个菜单拼接为一个字符串后一次输出，长列表在Windows控制台下明显更快
+    """
+    lines = [f"\n{prompt}"]
+    lines.extend(f"  [{i}] {name}" for i, name in enumerate(names, 1))
+    lines.append("  [0] 返回")
+    print("\n".join(lines))
+
+
 def print_separator(char="-", length=50):
     """打印分隔线"""
     print(char * length)
 
 
+def countdown(seconds, step=5):
+    """
+    显示倒计时并等待 seconds 秒
+    每 step 秒刷新一次显示，减少等待期间的唤醒与终端输出；Ctrl+C 时抛出 KeyboardInterrupt
+    """
+    remaining = seconds
+    while remaining > 0:
+        print(f"\r[倒计时] {remaining} 秒...  ", end='', flush=True)
+        chunk = min(step, remaining)
+        time.sleep(chunk)
+        remaining -= chunk
+    print()
+
+
 def print_after_action_ads():
     """打印操作完成后的赞助内容"""
     try:
         ads = ads_client.get_after_action_ads()
         if ads:
-            print("\n" + "*"*50)
-            print("  [赞助内容]")
+            lines = ["\n" + "*"*50, "  [赞助内容]"]
             for ad in ads:
                 title = ad.get('title', '')
                 content = ad.get('content', '')
                 link = ad.get('link_url', '')
                 
                 if title:
-                    print(f"{title}")
+                    lines.append(f"{title}")
                 if content:
-                    print(f"     {content}")
+                    lines.append(f"     {content}")
                 if link:
-                    print(f"     🔗 {link}")
-            print("*"*50)
+                    lines.append(f"     🔗 {link}")
+            lines.append("*"*50)
+            print("\n".join(lines))
     except Exception as e:
         pass  # 赞助内容获取失败不影响程序运行
 
@@ -75,10 +102,7 @@ def show_main_menu(config_manager):
 
 def show_area_selection(areas, prompt="请选择大区："):
     """显示大区选择"""
-    print(f"\n{prompt}")
-    for i, area in enumerate(areas, 1):
-        print(f"  [{i}] {area['areaName']}")
-    print("  [0] 返回")
+    _print_menu(prompt, (area['areaName'] for area in areas))
     
     while True:
         try:
@@ -101,10 +125,7 @@ def show_server_selection(servers, area_name, prompt=None):
     if prompt is None:
         prompt = f"请选择 {area_name} 的服务器："
     
-    print(f"\n{prompt}")
-    for i, server in enumerate(servers, 1):
-        print(f"  [{i}] {server['groupName']}")
-    print("  [0] 返回")
+    _print_menu(prompt, (server['groupName'] for server in servers))
     
     while True:
         try:
@@ -127,23 +148,19 @@ def show_server_selection_with_default(servers, area_name, default_server_name,
     if prompt is None:
         prompt = f"请确认您当前所在的服务器（{area_name}）："
     
-    # 找到默认服务器的索引
-    default_idx = None
-    for i, server in enumerate(servers):
-        if server['groupName'] == default_server_name:
-            default_idx = i
-            break
-    
-    print(f"\n{prompt}")
-    print(f"\n[说明] 订单显示您的目的地是 [{default_server_name}]")
-    print("[提示] 如果您在大区内又跨服到其他服务器，请选择实际所在服务器")
-    print()
+    # 找到默认服务器的索引（倒序构建，重名时与原先一样取第一个）
+    name_to_idx = {servers[i]['groupName']: i for i in reversed(range(len(servers)))}
+    default_idx = name_to_idx.get(default_server_name)
     
-    for i, server in enumerate(servers, 1):
-        server_name = server['groupName']
-        default_marker = " (默认)" if server_name == default_server_name else ""
-        print(f"  [{i}] {server_name}{default_marker}")
-    print("  [0] 返回")
+    header = (
+        f"{prompt}\n"
+        f"\n[说明] 订单显示您的目的地是 [{default_server_name}]\n"
+        "[提示] 如果您在大区内又跨服到其他服务器，请选择实际所在服务器\n"
+    )
+    _print_menu(header, (
+        server['groupName'] + (" (默认)" if server['groupName'] == default_server_name else "")
+        for server in servers
+    ))
     
     while True:
         try:
@@ -178,11 +195,10 @@ def show_role_selection(roles, server_name):
         print(f"\n[信息] 在 {server_name} 没有找到角色")
         return None
     
-    print(f"\n请选择角色（{server_name}）：")
-    for i, role in enumerate(roles, 1):
-        role_name = role.get('roleName', role.get('name', '未知'))
-        print(f"  [{i}] {role_name}")
-    print("  [0] 返回")
+    _print_menu(
+        f"请选择角色（{server_name}）：",
+        (role['_display_name'] for role in roles)
+    )
     
     while True:
         try:
@@ -213,12 +229,14 @@ def confirm_action(message):
 
 def show_transfer_summary(role_name, source_area, source_server, target_area, target_server):
     """显示传送摘要"""
-    print("\n" + "="*50)
-    print("传送信息确认:")
-    print(f"  角色: {role_name}")
-    print(f"  源区服: {source_area} - {source_server}")
-    print(f"  目标区服: {target_area} - {target_server}")
-    print("="*50)
+    print(
+        "\n" + "="*50 + "\n"
+        "传送信息确认:\n"
+        f"  角色: {role_name}\n"
+        f"  源区服: {source_area} - {source_server}\n"
+        f"  目标区服: {target_area} - {target_server}\n"
+        + "="*50
+    )
 
 
 def show_version_update_notice(version_info):